@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from price_sketches import normalize_marca
+
+# Ranking de concorrentes (VENCEDOR) por receita, volume e vitórias.
+#
+# Na ingestão as linhas são reduzidas a pré-agregados por partição
+# (Ano, Mes, Marca, Empresa). Uma consulta soma só as partições selecionadas e
+# faz seleção parcial do top-N (heap via nlargest) em vez de ordenar todos os
+# fornecedores; a posição no período anterior é contada por comparação
+# vetorizada, também sem ordenação completa.
+
+PARTITION_KEYS = ["Ano", "Mes", "Marca"]
+
+METRICS = {"Receita": "Receita (R$)", "Volume": "Volume (resmas)", "Vitorias": "Vitórias"}
+
+def normalize_empresa(empresa_clean):
+    return empresa_clean.astype("string").str.strip().str.replace(r"\s+", " ", regex=True)
+
+def build_competitor_aggregates(df):
+    """Pré-agregados por (Ano, Mes, Marca, Empresa) com Receita, Volume e Vitorias."""
+    columns = PARTITION_KEYS + ["Empresa", "Categoria", "Receita", "Volume", "Vitorias"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    base = pd.DataFrame({
+        "Ano": df["Ano"].to_numpy(),
+        "Mes": df["Mes"].to_numpy(),
+        "Marca": normalize_marca(df["Marca"]).to_numpy(),
+        "Empresa": normalize_empresa(df["Empresa_Clean"]).to_numpy(),
+        "Categoria": df["Categoria"].to_numpy(),
+        "Receita": df["Total_Venda"].to_numpy(dtype=float),
+        "Volume": df["Volume"].to_numpy(dtype=float),
+        "Vitorias": 1,
+    })
+    aggregates = base.groupby(PARTITION_KEYS + ["Empresa", "Categoria"], as_index=False)[["Receita", "Volume", "Vitorias"]].sum()
+    for col in ("Marca", "Empresa", "Categoria"):
+        aggregates[col] = aggregates[col].astype("category")
+    return aggregates[columns]
+
+def select_partitions(aggregates, years=None, months=None, marcas=None, include_own=True):
+    """Pré-agregados das partições selecionadas (None = sem filtro)."""
+    mask = np.ones(len(aggregates), dtype=bool)
+    for col, values in (("Ano", years), ("Mes", months), ("Marca", marcas)):
+        if values is not None:
+            mask &= aggregates[col].isin(list(values)).to_numpy()
+    if not include_own:
+        mask &= (aggregates["Categoria"] == "OUTROS").to_numpy()
+    return aggregates[mask]
+
+def totals_by_empresa(partitions):
+    """Soma das partições por empresa (uma linha por fornecedor)."""
+    totals = partitions.groupby("Empresa", observed=True)[["Receita", "Volume", "Vitorias"]].sum()
+    categorias = partitions.groupby("Empresa", observed=True)["Categoria"].first().astype(str)
+    return totals.assign(Categoria=categorias)
+
+def top_n(totals, metric="Receita", n=10):
+    """Top-N por métrica com seleção parcial (não ordena o restante)."""
+    top = totals.nlargest(n, metric, keep="first")
+    return top.assign(Posicao=np.arange(1, len(top) + 1))
+
+def rank_of(values, reference):
+    """Posição (1 = maior) de cada valor dentro de `reference`, sem ordenar `reference`."""
+    values = np.asarray(values, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    return 1 + (reference[None, :] > values[:, None]).sum(axis=1)
+
+def competitor_ranking(aggregates, metric="Receita", n=10, years=None, months=None, marcas=None,
+                       include_own=True, compare_years=None, compare_months=None):
+    """
+    Top-N da seleção atual e, se houver período de comparação, a posição de
+    cada empresa nele e a variação (positivo = subiu no ranking).
+    """
+    current = totals_by_empresa(select_partitions(aggregates, years, months, marcas, include_own))
+    current = current[current[metric] > 0]
+    ranking = top_n(current, metric, n)
+    ranking["Share"] = ranking[metric] / current[metric].sum() * 100 if len(current) else 0.0
+
+    if compare_years is not None or compare_months is not None:
+        previous = totals_by_empresa(select_partitions(aggregates, compare_years, compare_months, marcas, include_own))
+        previous = previous[previous[metric] > 0]
+        prev_values = previous[metric].reindex(ranking.index)
+        prev_rank = pd.Series(np.nan, index=ranking.index)
+        present = prev_values.notna().to_numpy()
+        if present.any():
+            prev_rank[present] = rank_of(prev_values[present], previous[metric].to_numpy())
+        ranking["Posicao_Anterior"] = prev_rank
+        ranking["Variacao"] = prev_rank - ranking["Posicao"]
+        ranking[f"{metric}_Anterior"] = prev_values
+
+    return ranking.reset_index()
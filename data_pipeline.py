@@ -0,0 +1,378 @@
+import numpy as np
+import pandas as pd
+import os
+import re
+import fnmatch
+import hashlib
+import unicodedata
+import time
+import warnings
+from dataclasses import dataclass, field
+
+import data_quality
+import price_sketches
+import competitor_ranking
+import tender_index
+import time_rollups
+import dataset_diff
+import pricing_simulator
+import sales_forecast
+import sparse_pivot
+
+# Suppress warnings
+warnings.filterwarnings("ignore")
+
+# Pipeline de ingestão compartilhado pelo dashboard e pelo watcher em background.
+# Não depende do Streamlit, então pode ser importado (e executado em outro processo)
+# sem disparar a interface.
+
+# BASE_DIR é relativo ao local do script (compatível com Deploy)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FILE_PATTERNS = [
+    {"pattern": "*1* SEMESTRE 2024*.xlsx", "year": 2024, "semester": 1, "engine": "openpyxl", "header_row": 1},
+    {"pattern": "*2* SEMESTRE 2024*.xlsb", "year": 2024, "semester": 2, "engine": "pyxlsb", "header_row": 0},
+    {"pattern": "*1* SEMESTRE 2025*.xlsb", "year": 2025, "semester": 1, "engine": "pyxlsb", "header_row": 0},
+    {"pattern": "*2* SEMESTRE 2025*.xlsb", "year": 2025, "semester": 2, "engine": "pyxlsb", "header_row": 0}
+]
+
+# Planilhas novas (ex: "COBERTURA DE PREÇOS 1º SEMESTRE 2026.xlsb") que ainda não estão em FILE_PATTERNS
+WORKBOOK_REGEX = re.compile(r"^cobertura.*?([12])\D{0,3}semestre\s*(\d{4}).*\.(xlsx|xlsb)$")
+
+ENGINE_BY_EXT = {"xlsx": "openpyxl", "xlsb": "pyxlsb"}
+
+# PRIORIDADES DE MAPEAMENTO (Ordem importa!)
+# Lista de tuplas (Campo Destino, [Lista de Candidatos em Ordem de Prioridade])
+COLUMN_PRIORITIES = [
+    ("Valor_Unitario", ["R$ FINAL", "R$ RESMA", "R$ TOTAL", "VALOR"]),
+    ("Empresa", ["VENCEDOR", "RAZÃO SOCIAL", "PARCEIRO", "FORNECEDOR"]),
+    ("Marca", ["MARCA"]),
+    ("Volume", ["VOLUME (RESMAS)", "VOLUME", "QUANTIDADE", "QTD"])
+]
+
+# Colunas opcionais: carregadas quando existem, sem invalidar a aba quando faltam
+OPTIONAL_COLUMN_PRIORITIES = [
+    ("Data_Evento", ["DATA DO EVENTO"]),
+    ("Pregao", ["NRO DO PREGÃO", "PREGÃO", "PREGAO"]),
+    ("Orgao", ["NOME DO ORGÃO", "NOME DO ORGAO", "ÓRGÃO", "ORGAO"])
+]
+
+# Termos proibidos em nomes de colunas para certos campos
+BLACKLIST_TERMS = {
+    "Empresa": ["ANTERIOR", "STATUS", "SITUAÇÃO", "RESULTADO", "COLOCAÇÃO", "ULTIMO"],
+    "Valor_Unitario": ["ANTERIOR", "ESTIMADO", "DIFERENÇA"]
+}
+
+# Status keywords to detect if a column is actually a status column
+STATUS_KEYWORDS_SET = {"GANHAMOS", "PERDEMOS", "SUSPENSA", "SUSPENSO", "ADIADO", "ADIOU", "CANCELADO", "FRACASSADO", "DESCLASSIFICADO", "NÃO PARTICIPAMOS"}
+
+months_lookup = {
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARÇO": 3, "MARCO": 3, "ABRIL": 4,
+    "MAIO": 5, "JUNHO": 6, "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9,
+    "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12
+}
+
+month_names = {v: k for k, v in months_lookup.items() if k != "MARCO"}
+
+def dedup_columns(columns):
+    seen = {}
+    new_cols = []
+    for col in columns:
+        if col in seen:
+            seen[col] += 1
+            new_cols.append(f"{col}.{seen[col]}")
+        else:
+            seen[col] = 0
+            new_cols.append(col)
+    return new_cols
+
+def detect_header_row(df_preview):
+    """Find header row dynamically."""
+    keywords = ["DATA DO EVENTO", "NRO DO PREGÃO", "VOLUME", "VENCEDOR", "VALOR", "EMPRESA", "PARCEIRO", "R$ FINAL"]
+    for i, row in df_preview.iterrows():
+        row_vals = [str(x).upper() for x in row.values if pd.notna(x)]
+        matches = 0
+        for k in keywords:
+            if any(k in val for val in row_vals):
+                matches += 1
+        if matches >= 3:
+            return i
+    return 0 # Fallback
+
+def smart_glob(base_dir, pattern, debug_logs=None):
+    """
+    Robust file finder that ignores case and encoding differences.
+    Uses fnmatch on lowercased NFC-normalized names.
+    """
+    try:
+        all_files = os.listdir(base_dir)
+    except Exception as e:
+        if debug_logs is not None:
+            debug_logs.append(f"Error listing dir {base_dir}: {e}")
+        return []
+
+    matched = []
+    pattern_norm = unicodedata.normalize('NFC', pattern).lower()
+
+    for f in all_files:
+        f_norm = unicodedata.normalize('NFC', f).lower()
+        if fnmatch.fnmatch(f_norm, pattern_norm):
+            matched.append(os.path.join(base_dir, f))
+
+    return sorted(matched)
+
+def discover_workbooks(base_dir=BASE_DIR, debug_logs=None):
+    """
+    Lista as planilhas COBERTURA a carregar: primeiro as de FILE_PATTERNS,
+    depois qualquer semestre novo reconhecido por WORKBOOK_REGEX.
+    Retorna dicts com path/year/semester/engine/header_row.
+    """
+    workbooks = []
+    seen_paths = set()
+
+    for info in FILE_PATTERNS:
+        found_files = smart_glob(base_dir, info["pattern"], debug_logs)
+        if not found_files:
+            if debug_logs is not None:
+                debug_logs.append(f"ARQUIVO NÃO ENCONTRADO (Pattern: {info['pattern']})")
+            continue
+        workbooks.append({**info, "path": found_files[0]})
+        seen_paths.add(found_files[0])
+
+    known = {(info["year"], info["semester"]) for info in FILE_PATTERNS}
+    try:
+        all_files = sorted(os.listdir(base_dir))
+    except Exception:
+        all_files = []
+
+    for f in all_files:
+        m = WORKBOOK_REGEX.match(unicodedata.normalize('NFC', f).lower())
+        path = os.path.join(base_dir, f)
+        if not m or path in seen_paths or f.startswith("~$"):
+            continue
+        semester, year, ext = int(m.group(1)), int(m.group(2)), m.group(3)
+        if (year, semester) in known:
+            continue
+        known.add((year, semester))
+        workbooks.append({
+            "pattern": f, "year": year, "semester": semester,
+            "engine": ENGINE_BY_EXT[ext], "header_row": 0, "path": path
+        })
+
+    return workbooks
+
+def dataset_signature(base_dir=BASE_DIR):
+    """
+    Assinatura barata (nome, tamanho, mtime) das planilhas monitoradas.
+    Muda sempre que uma planilha é adicionada, removida ou regravada.
+    """
+    signature = []
+    for info in discover_workbooks(base_dir):
+        try:
+            st_ = os.stat(info["path"])
+        except OSError:
+            continue
+        signature.append((os.path.basename(info["path"]), st_.st_size, st_.st_mtime_ns))
+    return tuple(sorted(signature))
+
+def signature_version(signature):
+    """Versão curta e estável derivada da assinatura dos arquivos."""
+    return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:12]
+
+def is_status_column(series):
+    # Check if a significant portion of the non-null values are status keywords
+    sample = series.dropna().astype(str).str.upper().str.strip()
+    if sample.empty: return False
+
+    # Check precise matches or partial matches
+    match_count = sample.apply(lambda x: any(k in x for k in STATUS_KEYWORDS_SET) or x in STATUS_KEYWORDS_SET).sum()
+    return (match_count / len(sample)) > 0.3 # If >30% looks like status, it's a status column
+
+def map_columns(df, priorities=COLUMN_PRIORITIES):
+    """Aplica as prioridades/BLACKLIST_TERMS e devolve (df renomeado, alvos encontrados)."""
+    rename_dict = {}
+    found_targets = set()
+
+    for target, candidates in priorities:
+        best_match = None
+        # Stop at the first candidate keyword that produces valid matches (VENCEDOR > RAZÃO SOCIAL)
+        for candidate in candidates:
+            matches = [c for c in df.columns if candidate in c]
+            if target in BLACKLIST_TERMS:
+                matches = [c for c in matches if not any(bad in c for bad in BLACKLIST_TERMS[target])]
+
+            if target == "Empresa":
+                matches = [m for m in matches if not is_status_column(df[m])]
+
+            if matches:
+                best_match = min(matches, key=len)
+                break
+
+        if best_match:
+            rename_dict[best_match] = target
+            found_targets.add(target)
+
+    df.rename(columns=rename_dict, inplace=True)
+    return df, found_targets
+
+def load_data(base_dir=BASE_DIR):
+    all_data = []
+    debug_logs = []
+
+    for info in discover_workbooks(base_dir, debug_logs):
+        actual_path = info["path"]
+        filename = os.path.basename(actual_path)
+
+        try:
+            xl = pd.ExcelFile(actual_path, engine=info["engine"])
+            sheet_names = xl.sheet_names
+
+            for sheet in sheet_names:
+                upper_sheet = sheet.upper().strip()
+                month_num = months_lookup.get(upper_sheet)
+
+                if not month_num:
+                    continue
+
+                # Step 1: Read valid preview to find header
+                try:
+                    df_preview = pd.read_excel(actual_path, sheet_name=sheet, engine=info["engine"], header=None, nrows=10)
+                    header_idx = detect_header_row(df_preview)
+                except Exception as e:
+                    debug_logs.append(f"Error previewing {filename} [{sheet}]: {e}")
+                    header_idx = info["header_row"] # Fallback to config
+
+                # Step 2: Read full sheet with detected header
+                try:
+                    df = pd.read_excel(actual_path, sheet_name=sheet, engine=info["engine"], header=header_idx)
+                except Exception as e:
+                     debug_logs.append(f"Error reading {filename} [{sheet}] with header={header_idx}: {e}")
+                     continue
+
+                raw_cols = [str(c).strip().upper() for c in df.columns]
+                df.columns = dedup_columns(raw_cols)
+
+                # --- LOGICA DE MAPEAMENTO POR PRIORIDADE ---
+                df, found_targets = map_columns(df)
+                df, found_optional = map_columns(df, OPTIONAL_COLUMN_PRIORITIES)
+
+                # Validation
+                missing = [t[0] for t in COLUMN_PRIORITIES if t[0] not in found_targets]
+                if not missing:
+                    cols_to_keep = ["Empresa", "Marca", "Valor_Unitario", "Volume"]
+                    subset_df = df[cols_to_keep].copy()
+                    for target, _ in OPTIONAL_COLUMN_PRIORITIES:
+                        subset_df[target] = df[target] if target in found_optional else None
+                    subset_df["Ano"] = info["year"]
+                    subset_df["Mes"] = month_num
+                    subset_df["Origem"] = filename
+                    subset_df["Aba"] = sheet
+                    all_data.append(subset_df)
+                else:
+                    debug_logs.append(f"MISSING {missing} in {filename} [{sheet}] (Header Row: {header_idx}). Found: {df.columns.tolist()}")
+
+        except Exception as e:
+            debug_logs.append(f"ERROR reading {filename}: {str(e)}")
+
+    if not all_data:
+        return pd.DataFrame(), debug_logs
+
+    full_df = pd.concat(all_data, ignore_index=True)
+    return full_df, debug_logs
+
+def categorize(empresa_clean):
+    """RDF / ATUAL / OUTROS a partir do nome normalizado (vetorizado)."""
+    is_rdf = empresa_clean.str.contains("RDF|RD F|R\\.D\\.F", regex=True, na=False)
+    is_atual = empresa_clean.str.contains("ATUAL", regex=False, na=False)
+    return pd.Series(np.select([is_rdf, is_atual], ["RDF", "ATUAL"], default="OUTROS"), index=empresa_clean.index)
+
+def clean_with_quality(df):
+    """Limpeza + regras de qualidade. Retorna (df limpo, quarentena, relatório)."""
+    if df.empty:
+        return df, df, pd.DataFrame(columns=["Origem", "Aba", "Regra", "Acao", "Linhas"])
+
+    df, quarantine, report = data_quality.run_quality_checks(df)
+
+    # Categorização
+    df["Empresa_Clean"] = df["Empresa"].astype(str).str.upper()
+    df["Categoria"] = categorize(df["Empresa_Clean"])
+
+    return df, quarantine, report
+
+def clean_and_process(df):
+    df, _, _ = clean_with_quality(df)
+    return df
+
+CUBE_KEYS = ["Ano", "Mes", "Categoria"]
+
+def build_sales_cube(df):
+    """Cubo pré-agregado (Ano, Mes, Categoria) com vendas, volume e número de linhas."""
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + ["Total_Venda", "Volume", "Linhas"])
+    cube = df.groupby(CUBE_KEYS, as_index=False).agg(
+        Total_Venda=("Total_Venda", "sum"), Volume=("Volume", "sum"), Linhas=("Total_Venda", "size")
+    )
+    return cube
+
+@dataclass
+class Dataset:
+    """Versão imutável do dataset servida às sessões do dashboard."""
+    version: str
+    signature: tuple
+    raw_df: pd.DataFrame
+    df: pd.DataFrame
+    debug_logs: list = field(default_factory=list)
+    quarantine: pd.DataFrame = field(default_factory=pd.DataFrame)
+    quality_report: pd.DataFrame = field(default_factory=pd.DataFrame)
+    sales_cube: pd.DataFrame = field(default_factory=pd.DataFrame)
+    price_sketches: pd.DataFrame = field(default_factory=pd.DataFrame)
+    competitor_aggregates: pd.DataFrame = field(default_factory=pd.DataFrame)
+    tender_index: object = None
+    time_rollups: dict = field(default_factory=dict)
+    scenario_cube: pd.DataFrame = field(default_factory=pd.DataFrame)
+    forecasts: pd.DataFrame = field(default_factory=pd.DataFrame)
+    pivot_store: object = None
+    row_manifest: pd.DataFrame = field(default_factory=pd.DataFrame)
+    sheet_digests: pd.DataFrame = field(default_factory=pd.DataFrame)
+    built_at: float = 0.0
+    build_seconds: float = 0.0
+
+def build_dataset(base_dir=BASE_DIR, save_snapshot=True):
+    """
+    Executa o pipeline completo (leitura + limpeza + estruturas derivadas) e devolve
+    um Dataset. Com save_snapshot, grava o manifesto da versão para dataset_diff.py.
+    """
+    start = time.time()
+    signature = dataset_signature(base_dir)
+    raw_df, debug_logs = load_data(base_dir)
+    df, quarantine, quality_report = clean_with_quality(raw_df)
+    row_manifest = dataset_diff.build_row_manifest(df)
+    dataset = Dataset(
+        version=signature_version(signature),
+        signature=signature,
+        raw_df=raw_df,
+        df=df,
+        debug_logs=debug_logs,
+        quarantine=quarantine,
+        quality_report=quality_report,
+        sales_cube=build_sales_cube(df),
+        price_sketches=price_sketches.build_price_sketches(df),
+        competitor_aggregates=competitor_ranking.build_competitor_aggregates(df),
+        tender_index=tender_index.build_tender_index(df),
+        time_rollups=time_rollups.build_time_rollups(df),
+        scenario_cube=pricing_simulator.build_scenario_cube(df),
+        forecasts=sales_forecast.build_forecasts(df),
+        pivot_store=sparse_pivot.build_pivot_store(df),
+        row_manifest=row_manifest,
+        sheet_digests=dataset_diff.build_sheet_digests(row_manifest),
+        built_at=time.time(),
+        build_seconds=time.time() - start,
+    )
+
+    if save_snapshot and not df.empty:
+        try:
+            dataset_diff.save_snapshot(dataset, base_dir)
+        except Exception as e:
+            debug_logs.append(f"Não foi possível gravar a versão {dataset.version}: {e}")
+
+    return dataset
@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+# Etapa de qualidade de dados: todas as regras são máscaras vetorizadas avaliadas
+# em um único passo sobre o dataframe bruto. Linhas rejeitadas vão para a
+# quarentena com o código do motivo, em vez de sumirem silenciosamente.
+
+# Nomes de empresa que na verdade são status do pregão
+STATUS_KEYWORDS = ["GANHAMOS", "PERDEMOS", "DESCLASSIFICADO", "FRACASSADO"]
+
+# (código, ação, descrição) — a ordem define o motivo principal quando várias regras falham
+RULES = [
+    ("EMPRESA_VAZIA", "rejeita", "Empresa ausente ou em branco"),
+    ("EMPRESA_STATUS", "rejeita", "Empresa é um status do pregão (GANHAMOS, PERDEMOS...)"),
+    ("VALOR_INVALIDO", "rejeita", "Valor_Unitario ausente ou não numérico"),
+    ("VALOR_NAO_POSITIVO", "rejeita", "Valor_Unitario <= 0"),
+    ("LINHA_DUPLICADA", "rejeita", "Mesmo pregão/linha já registrado em outra aba ou planilha"),
+    ("VOLUME_INVALIDO", "ajusta", "Volume ausente ou não numérico (assumido 1)"),
+    ("VOLUME_ZERO", "ajusta", "Volume igual a 0 (assumido 1)"),
+]
+
+RULE_ACTIONS = {code: action for code, action, _ in RULES}
+RULE_DESCRIPTIONS = {code: desc for code, _, desc in RULES}
+
+def parse_numeric(series, strip_currency=False):
+    """
+    Versão vetorizada de clean_money/clean_vol: "R$ 1.200,50" -> 1200.5.
+    Se houver vírgula ela é o separador decimal. Valores não numéricos viram NaN.
+    """
+    s = series.astype("string").str.upper().str.replace(" ", "", regex=False)
+    if strip_currency:
+        s = s.str.replace("R$", "", regex=False)
+    has_comma = s.str.contains(",", regex=False, na=False)
+    s = s.where(~has_comma, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(s, errors="coerce").astype(float)
+
+# Colunas (já normalizadas) que identificam uma linha de pregão para deduplicação
+DEDUP_COLUMNS = ["Pregao", "Data_Evento", "Orgao", "Empresa", "Marca", "Valor_Unitario", "Volume"]
+
+# Datas do Excel vêm como serial (dias desde 1899-12-30) nas planilhas .xlsb
+EXCEL_EPOCH = "1899-12-30"
+EXCEL_SERIAL_RANGE = (20000, 80000)
+
+PREGAO_REGEX = r"^([A-Z]+)\s*0*(\d+)\s*/\s*(\d{2,4})$"
+
+def normalize_text(series):
+    """Maiúsculas, sem espaços nas pontas e com espaços internos colapsados (NaN preservado)."""
+    s = series.astype("string").str.upper().str.strip().str.replace(r"\s+", " ", regex=True)
+    return s.mask(s == "")
+
+def normalize_pregao(series):
+    """'PE062/2024', 'pe 62 / 24' -> 'PE 62/2024'. Formatos desconhecidos ficam só normalizados."""
+    # Pregão digitado como número chega como float (62.0): vira "62", não "62.0"
+    numeric = pd.to_numeric(series, errors="coerce")
+    integral = (numeric.notna() & (numeric % 1 == 0)).to_numpy()
+    if integral.any():
+        series = series.astype(object)
+        series[integral] = numeric[integral].astype("int64").astype(str)
+    s = normalize_text(series)
+    parts = s.str.extract(PREGAO_REGEX)
+    year = parts[2].where(parts[2].str.len() != 2, "20" + parts[2])
+    canonical = parts[0] + " " + parts[1] + "/" + year
+    return canonical.fillna(s)
+
+def parse_event_date(series):
+    """
+    DATA DO EVENTO em qualquer dos formatos das planilhas: datetime (xlsx),
+    serial do Excel (xlsb), texto dd/mm/aa ou ISO (aaaa-mm-dd). Não reconhecidos viram NaT.
+    """
+    numeric = pd.to_numeric(series, errors="coerce")
+    serial = numeric.between(*EXCEL_SERIAL_RANGE).to_numpy()
+
+    # Números fora da faixa de serial (0, 12, 2024...) não são datas: ficam NaT
+    others = series.where(~serial & numeric.isna().to_numpy())
+    dates = pd.to_datetime(others, format="%d/%m/%y", errors="coerce")
+    for fmt in ("%d/%m/%Y", "ISO8601"):
+        pending = dates.isna() & others.notna()
+        if not pending.any():
+            break
+        dates[pending] = pd.to_datetime(others[pending], format=fmt, errors="coerce")
+
+    # Último recurso: dia primeiro, exceto quando o texto começa pelo ano (aaaa-...)
+    year_first = others.astype("string").str.strip().str.match(r"\d{4}\D", na=False)
+    for dayfirst in (True, False):
+        pending = dates.isna() & others.notna() & (year_first != dayfirst)
+        if pending.any():
+            dates[pending] = pd.to_datetime(others[pending], format="mixed", dayfirst=dayfirst, errors="coerce")
+
+    dates = dates.astype("datetime64[ns]")
+    if serial.any():
+        dates[serial] = pd.to_datetime(numeric[serial], unit="D", origin=EXCEL_EPOCH)
+    return dates
+
+def check_event_dates():
+    """Conferência de parse_event_date com os formatos das planilhas e valores inválidos."""
+    samples = pd.Series([
+        pd.Timestamp("2024-03-05"), 45356, "45356", "05/03/24", "05/03/2024", "2024-03-05",
+        "5/3/2024 10:00", 0, 7, 12, 2024, -1, "lixo", None,
+    ], dtype=object)
+    expected = [pd.Timestamp("2024-03-05")] * 6 + [pd.Timestamp("2024-03-05 10:00")] + [pd.NaT] * 7
+    parsed = parse_event_date(samples)
+    assert parsed.tolist() == expected, parsed.tolist()
+    return parsed
+
+def row_hashes(df, columns=DEDUP_COLUMNS):
+    """Hash de conteúdo (uint64) por linha, calculado de forma vetorizada."""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+def find_cross_sheet_duplicates(df, candidates):
+    """
+    Marca linhas cujo conteúdo já apareceu em outra aba/planilha (mantém a primeira).
+    Repetições dentro da mesma aba são preservadas — podem ser lotes diferentes do
+    mesmo pregão. Só considera linhas com número de pregão.
+    """
+    duplicated = np.zeros(len(df), dtype=bool)
+    eligible = candidates & df["Pregao"].notna().to_numpy()
+    if not eligible.any():
+        return duplicated
+
+    subset = df.loc[eligible]
+    sheet = subset["Origem"].astype(str) + "|" + subset["Aba"].astype(str)
+    keys = pd.Series(row_hashes(subset), index=subset.index)
+    first_sheet = sheet.groupby(keys.to_numpy()).transform("first")
+    duplicated[eligible] = (sheet != first_sheet).to_numpy()
+    return duplicated
+
+def run_quality_checks(df):
+    """
+    Avalia todas as regras de RULES de uma vez.
+
+    Retorna (válidas, quarentena, relatório):
+    - válidas: linhas aprovadas com Valor_Unitario/Volume numéricos e Total_Venda
+    - quarentena: linhas rejeitadas com a coluna Motivo
+    - relatório: contagem por Origem/Aba/Regra/Acao (inclui ajustes)
+    """
+    empresa = df["Empresa"]
+    empresa_str = empresa.astype(str)
+
+    valor = parse_numeric(df["Valor_Unitario"], strip_currency=True)
+    if "Volume" in df.columns:
+        volume = parse_numeric(df["Volume"])
+    else:
+        volume = pd.Series(1.0, index=df.index)
+
+    typed = df.assign(
+        Empresa=normalize_text(empresa),
+        Marca=normalize_text(df["Marca"]),
+        Valor_Unitario=valor,
+        Volume=volume.fillna(0).replace(0, 1),
+        Data_Evento=parse_event_date(df["Data_Evento"]) if "Data_Evento" in df.columns else pd.NaT,
+        Pregao=normalize_pregao(df["Pregao"]) if "Pregao" in df.columns else pd.NA,
+        Orgao=normalize_text(df["Orgao"]) if "Orgao" in df.columns else pd.NA,
+    )
+
+    masks = {
+        "EMPRESA_VAZIA": empresa.isna() | (empresa_str.str.strip() == ""),
+        "EMPRESA_STATUS": empresa.notna() & empresa_str.str.upper().isin(STATUS_KEYWORDS),
+        "VALOR_INVALIDO": valor.isna(),
+        "VALOR_NAO_POSITIVO": valor.notna() & (valor <= 0),
+        "VOLUME_INVALIDO": volume.isna(),
+        "VOLUME_ZERO": volume == 0,
+    }
+
+    reject_codes = [code for code, action, _ in RULES if action == "rejeita"]
+    adjust_codes = [code for code, action, _ in RULES if action == "ajusta"]
+
+    # Duplicatas só entre as linhas que passaram nas demais regras
+    row_checks = [c for c in reject_codes if c != "LINHA_DUPLICADA"]
+    passed = ~np.logical_or.reduce([masks[c].to_numpy() for c in row_checks])
+    masks["LINHA_DUPLICADA"] = pd.Series(find_cross_sheet_duplicates(typed, passed), index=df.index)
+
+    # Motivo principal = primeira regra de rejeição que falha
+    reason = np.select([masks[c].to_numpy() for c in reject_codes], reject_codes, default="")
+    rejected = reason != ""
+
+    # Mesmo comportamento de antes: volume inválido ou zero conta como 1 unidade
+    valid = df.loc[~rejected].copy()
+    valid["Valor_Unitario"] = typed["Valor_Unitario"][~rejected]
+    valid["Volume"] = typed["Volume"][~rejected]
+    valid["Total_Venda"] = valid["Valor_Unitario"] * valid["Volume"]
+    for col in ("Data_Evento", "Pregao", "Orgao"):
+        valid[col] = typed[col][~rejected]
+
+    # Na quarentena Valor/Volume ficam como vieram (para auditoria); as colunas do pregão já tipadas
+    quarantine = df.loc[rejected].copy()
+    quarantine.insert(0, "Motivo", reason[rejected])
+    for col in ("Data_Evento", "Pregao", "Orgao"):
+        quarantine[col] = typed[col][rejected]
+
+    # Relatório: rejeições pelo motivo principal + ajustes aplicados às linhas válidas
+    adjust = np.select([masks[c].to_numpy() & ~rejected for c in adjust_codes], adjust_codes, default="")
+    events = pd.DataFrame({
+        "Origem": df.get("Origem", pd.Series("", index=df.index)).to_numpy(),
+        "Aba": df.get("Aba", pd.Series("", index=df.index)).to_numpy(),
+        "Regra": np.where(rejected, reason, adjust),
+    })
+    events = events[events["Regra"] != ""]
+    report = events.groupby(["Origem", "Aba", "Regra"], sort=False).size().reset_index(name="Linhas")
+    report.insert(3, "Acao", report["Regra"].map(RULE_ACTIONS))
+
+    return valid, quarantine, report
+
+def summarize_by_rule(report):
+    """Total de linhas por regra (para a aba Data Inspector)."""
+    if report.empty:
+        return pd.DataFrame(columns=["Regra", "Acao", "Descricao", "Linhas"])
+    summary = report.groupby(["Regra", "Acao"])["Linhas"].sum().reset_index()
+    summary.insert(2, "Descricao", summary["Regra"].map(RULE_DESCRIPTIONS))
+    return summary.sort_values("Linhas", ascending=False)
+
+def summarize_by_sheet(report):
+    """Matriz Origem/Aba x Regra com as contagens."""
+    if report.empty:
+        return pd.DataFrame()
+    return report.pivot_table(index=["Origem", "Aba"], columns="Regra", values="Linhas", aggfunc="sum", fill_value=0)
+
+if __name__ == "__main__":
+    check_event_dates()
+    print("OK: datas do evento")
@@ -0,0 +1,249 @@
+import argparse
+import glob
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_quality import row_hashes
+
+# Manifesto por linha (hash de conteúdo) e digest por aba de cada ingestão,
+# gravados ao lado do dataset para comparar versões sem reabrir o Excel.
+#
+# Cada linha tem duas chaves:
+# - Chave: identidade da linha (ano/mês da aba, pregão, órgão, data do evento e
+#   a ordem dentro desse grupo) — continua igual quando preço/volume são corrigidos
+# - Hash: conteúdo completo da linha — muda com qualquer edição
+# O diff pula abas com o mesmo digest e, nas demais, faz dois hash joins
+# (lineares): primeiro casa linhas de conteúdo idêntico (Hash); só as que
+# sobram são pareadas pela identidade (pregão/órgão/data), virando "alteradas".
+# Assim remover um lote de um pregão com vários lotes não desloca os outros.
+#
+# Uso: python dataset_diff.py                 (compara as duas últimas versões)
+#      python dataset_diff.py --list
+#      python dataset_diff.py <versao_antiga> <versao_nova> --csv mudancas.csv
+
+SNAPSHOT_DIRNAME = "dataset_versions"
+MAX_SNAPSHOTS = 20
+
+SHEET_KEYS = ["Ano", "Mes"]
+IDENTITY_COLUMNS = ["Ano", "Mes", "Pregao", "Orgao", "Data_Evento"]
+CONTENT_COLUMNS = ["Pregao", "Data_Evento", "Orgao", "Empresa", "Marca", "Valor_Unitario", "Volume"]
+MANIFEST_COLUMNS = ["Chave", "Hash", "Ano", "Mes", "Origem", "Aba", "Pregao", "Orgao", "Data_Evento",
+                    "Empresa", "Marca", "Categoria", "Valor_Unitario", "Volume", "Total_Venda"]
+
+def build_row_manifest(df):
+    """Uma linha por registro válido com Chave (identidade) e Hash (conteúdo)."""
+    if df.empty:
+        return pd.DataFrame(columns=MANIFEST_COLUMNS)
+
+    manifest = df[[c for c in MANIFEST_COLUMNS if c in df.columns]].copy()
+    for col in IDENTITY_COLUMNS + CONTENT_COLUMNS:
+        if col not in manifest.columns:
+            manifest[col] = None
+
+    identity = manifest[IDENTITY_COLUMNS].copy()
+    identity["Ocorrencia"] = identity.groupby(IDENTITY_COLUMNS, dropna=False).cumcount()
+    manifest["Chave"] = row_hashes(identity, IDENTITY_COLUMNS + ["Ocorrencia"])
+    manifest["Hash"] = row_hashes(manifest, CONTENT_COLUMNS + ["Categoria"])
+    return manifest[MANIFEST_COLUMNS].reset_index(drop=True)
+
+def build_sheet_digests(manifest):
+    """Digest por aba (soma dos hashes, independente da ordem) e contagem de linhas."""
+    if manifest.empty:
+        return pd.DataFrame(columns=SHEET_KEYS + ["Digest", "Linhas", "Total_Venda"])
+    return manifest.groupby(SHEET_KEYS, as_index=False).agg(
+        Digest=("Hash", lambda h: f"{int(np.add.reduce(h.to_numpy(dtype=np.uint64), dtype=np.uint64)):016x}"),
+        Linhas=("Hash", "size"),
+        Total_Venda=("Total_Venda", "sum"),
+    )
+
+# --- Armazenamento das versões ---
+
+def snapshot_dir(base_dir):
+    return os.path.join(base_dir, SNAPSHOT_DIRNAME)
+
+def save_snapshot(dataset, base_dir, keep=MAX_SNAPSHOTS):
+    """Grava manifesto + digests da versão (uma vez por versão) e poda as mais antigas."""
+    directory = snapshot_dir(base_dir)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{dataset.version}.pkl")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({
+                "version": dataset.version,
+                "built_at": dataset.built_at,
+                "signature": dataset.signature,
+                "manifest": dataset.row_manifest,
+                "sheet_digests": dataset.sheet_digests,
+            }, f)
+        os.replace(tmp_path, path)
+
+    for old in list_snapshots(base_dir)[:-keep]:
+        os.remove(old["path"])
+    return path
+
+def list_snapshots(base_dir):
+    """Versões gravadas, da mais antiga para a mais nova."""
+    snapshots = []
+    for path in glob.glob(os.path.join(snapshot_dir(base_dir), "*.pkl")):
+        snapshots.append({
+            "version": os.path.splitext(os.path.basename(path))[0],
+            "path": path,
+            "mtime": os.path.getmtime(path),
+        })
+    return sorted(snapshots, key=lambda s: s["mtime"])
+
+def load_snapshot(base_dir, version):
+    path = os.path.join(snapshot_dir(base_dir), f"{version}.pkl")
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+# --- Diff ---
+
+def diff_manifests(old_manifest, new_manifest, old_digests=None, new_digests=None):
+    """
+    Compara duas versões. Retorna dict com:
+    - added / removed / changed: linhas (changed traz colunas _antigo/_novo)
+    - impact: variação de Total_Venda por Categoria, Ano e Mes
+    - sheets: digests lado a lado, com a coluna Alterada
+    """
+    if old_digests is None:
+        old_digests = build_sheet_digests(old_manifest)
+    if new_digests is None:
+        new_digests = build_sheet_digests(new_manifest)
+
+    sheets = old_digests.merge(new_digests, on=SHEET_KEYS, how="outer", suffixes=("_antigo", "_novo"))
+    sheets["Alterada"] = sheets["Digest_antigo"] != sheets["Digest_novo"]
+
+    # Só as abas cujo digest mudou entram no join
+    changed_sheets = sheets.loc[sheets["Alterada"], SHEET_KEYS]
+    old_rows = old_manifest.merge(changed_sheets, on=SHEET_KEYS)
+    new_rows = new_manifest.merge(changed_sheets, on=SHEET_KEYS)
+
+    # 1º passo: conteúdo idêntico nos dois lados = linha sem mudança
+    same = _pair(old_rows["Hash"].to_numpy(), new_rows["Hash"].to_numpy())
+    old_rest = old_rows.drop(index=same["_antigo"]).reset_index(drop=True)
+    new_rest = new_rows.drop(index=same["_novo"]).reset_index(drop=True)
+
+    # 2º passo: o que sobrou é pareado pela identidade (mesmo pregão/órgão/data, na ordem)
+    pairs = _pair(_identity(old_rest), _identity(new_rest))
+    removed = old_rest.drop(index=pairs["_antigo"]).reset_index(drop=True)
+    added = new_rest.drop(index=pairs["_novo"]).reset_index(drop=True)
+    changed_old = old_rest.loc[pairs["_antigo"]].reset_index(drop=True)
+    changed_new = new_rest.loc[pairs["_novo"]].reset_index(drop=True)
+    changed = pd.concat([changed_old.add_suffix("_antigo"), changed_new.add_suffix("_novo")], axis=1)
+
+    impact = pd.concat([
+        added.assign(Delta=added["Total_Venda"]),
+        removed.assign(Delta=-removed["Total_Venda"]),
+        changed_new.assign(Delta=changed_new["Total_Venda"]),
+        changed_old.assign(Delta=-changed_old["Total_Venda"]),
+    ], ignore_index=True)
+    if impact.empty:
+        impact = pd.DataFrame(columns=["Categoria", "Ano", "Mes", "Delta"])
+    else:
+        impact = impact.groupby(["Categoria", "Ano", "Mes"], as_index=False)["Delta"].sum()
+        impact[SHEET_KEYS] = impact[SHEET_KEYS].astype(int)
+        impact = impact[impact["Delta"].round(2) != 0]
+
+    return {"added": added, "removed": removed, "changed": changed, "impact": impact, "sheets": sheets}
+
+def _pair(old_keys, new_keys):
+    """
+    Casa chaves iguais dos dois lados, repetições pela ordem (multiconjunto).
+    Retorna as posições casadas em cada lado (colunas _antigo e _novo).
+    """
+    old = pd.DataFrame({"k": old_keys, "_antigo": np.arange(len(old_keys))})
+    new = pd.DataFrame({"k": new_keys, "_novo": np.arange(len(new_keys))})
+    old["n"] = old.groupby("k").cumcount()
+    new["n"] = new.groupby("k").cumcount()
+    return old.merge(new, on=["k", "n"])[["_antigo", "_novo"]]
+
+def _identity(rows):
+    """Hash da identidade (ano/mês, pregão, órgão, data do evento) de cada linha."""
+    if rows.empty:
+        return np.array([], dtype=np.uint64)
+    return row_hashes(rows, IDENTITY_COLUMNS)
+
+def export_changes(result):
+    """
+    Linhas adicionadas/removidas/alteradas numa tabela só. Hashes viram texto
+    hexadecimal (o concat com colunas ausentes os transformaria em float) e
+    Ano/Mes ficam inteiros.
+    """
+    frames = []
+    for kind, frame in (("adicionada", result["added"]), ("removida", result["removed"]), ("alterada", result["changed"])):
+        frame = frame.copy()
+        for col in frame.columns:
+            if col.startswith(("Chave", "Hash")):
+                frame[col] = [f"{int(v):016x}" for v in frame[col]]
+        frames.append(frame.assign(Tipo=kind))
+    out = pd.concat(frames, ignore_index=True)
+    for col in out.columns:
+        if col.startswith(("Ano", "Mes")):
+            out[col] = out[col].astype("Int64")
+    return out
+
+def print_report(result, old_version, new_version):
+    print(f"=== DIFF {old_version} -> {new_version} ===\n")
+    sheets = result["sheets"]
+    print(f"Abas alteradas: {int(sheets['Alterada'].sum())} de {len(sheets)}")
+    print(f"Linhas adicionadas: {len(result['added'])}")
+    print(f"Linhas removidas:   {len(result['removed'])}")
+    print(f"Linhas alteradas:   {len(result['changed'])}\n")
+
+    impact = result["impact"]
+    if impact.empty:
+        print("Sem impacto em Total_Venda.")
+        return
+    print("Impacto em Total_Venda por Categoria:")
+    print(impact.groupby("Categoria")["Delta"].sum().to_string(float_format=lambda v: f"R$ {v:,.2f}"))
+    print("\nImpacto por Categoria e Mês:")
+    print(impact.pivot_table(index=["Ano", "Mes"], columns="Categoria", values="Delta", aggfunc="sum", fill_value=0)
+          .to_string(float_format=lambda v: f"{v:,.2f}"))
+
+def main(argv=None):
+    import data_pipeline
+
+    parser = argparse.ArgumentParser(description="Diferenças entre duas versões do dataset de vendas")
+    parser.add_argument("old", nargs="?", help="versão antiga (padrão: penúltima gravada)")
+    parser.add_argument("new", nargs="?", help="versão nova (padrão: última gravada)")
+    parser.add_argument("--base-dir", default=data_pipeline.BASE_DIR)
+    parser.add_argument("--list", action="store_true", help="lista as versões gravadas")
+    parser.add_argument("--snapshot", action="store_true", help="lê as planilhas atuais e grava a versão antes de comparar")
+    parser.add_argument("--csv", help="grava as linhas adicionadas/removidas/alteradas neste CSV")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        dataset = data_pipeline.build_dataset(args.base_dir)
+        print(f"Versão atual gravada: {dataset.version}")
+
+    snapshots = list_snapshots(args.base_dir)
+    if args.list:
+        for s in snapshots:
+            print(f"{s['version']}  {pd.Timestamp(s['mtime'], unit='s'):%Y-%m-%d %H:%M:%S}")
+        return 0
+
+    versions = [s["version"] for s in snapshots]
+    old_version = args.old or (versions[-2] if len(versions) >= 2 else None)
+    new_version = args.new or (versions[-1] if versions else None)
+    if not old_version or not new_version:
+        print("São necessárias duas versões gravadas (use --snapshot após atualizar as planilhas).")
+        return 1
+
+    old = load_snapshot(args.base_dir, old_version)
+    new = load_snapshot(args.base_dir, new_version)
+    result = diff_manifests(old["manifest"], new["manifest"], old["sheet_digests"], new["sheet_digests"])
+    print_report(result, old_version, new_version)
+
+    if args.csv:
+        export_changes(result).to_csv(args.csv, index=False)
+        print(f"\nDetalhes gravados em {args.csv}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import data_pipeline
+
+# Watchdog (inotify no Linux) é opcional: sem ele o watcher cai para polling puro.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+POLL_INTERVAL = 30   # segundos entre verificações quando não há eventos do SO
+SETTLE_SECONDS = 3   # espera a assinatura estabilizar (cópia do OneDrive em andamento)
+
+class _WakeHandler(FileSystemEventHandler):
+    """Acorda o watcher quando algo muda em BASE_DIR."""
+
+    def __init__(self, wake_event):
+        self.wake_event = wake_event
+
+    def on_any_event(self, event):
+        name = os.path.basename(str(getattr(event, "dest_path", "") or event.src_path)).upper()
+        if "COBERTURA" in name:
+            self.wake_event.set()
+
+class DatasetWatcher:
+    """
+    Monitora BASE_DIR e reconstrói o dataset em background.
+
+    As sessões sempre leem `current()`, que devolve a última versão completa;
+    a nova versão só substitui a anterior depois de pronta (troca atômica de
+    referência), então nenhum usuário paga o custo de recarga na própria requisição.
+    """
+
+    def __init__(self, base_dir=data_pipeline.BASE_DIR, poll_interval=POLL_INTERVAL,
+                 settle_seconds=SETTLE_SECONDS, use_process=True, on_swap=None):
+        self.base_dir = base_dir
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.use_process = use_process
+        self.on_swap = on_swap
+
+        self._current = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+        self._executor = None
+
+        self.last_error = None
+        self.last_check = None
+        self.rebuilds = 0
+        self.mode = "polling"
+
+    # --- API pública ---
+
+    def current(self):
+        """Versão atual do dataset (None antes da primeira carga)."""
+        return self._current
+
+    def start(self, block_initial=True):
+        """Inicia o monitoramento. Com block_initial, faz a primeira carga de forma síncrona."""
+        if self._thread is not None:
+            return self
+
+        if block_initial and self._current is None:
+            self._swap(data_pipeline.build_dataset(self.base_dir))
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WakeHandler(self._wake), self.base_dir, recursive=False)
+                self._observer.daemon = True
+                self._observer.start()
+                self.mode = "inotify"
+            except Exception as e:
+                self._observer = None
+                self.last_error = f"Watchdog indisponível, usando polling: {e}"
+
+        self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def request_refresh(self):
+        """Força uma verificação imediata (ex: botão no dashboard)."""
+        self._wake.set()
+
+    def status(self):
+        dataset = self._current
+        return {
+            "mode": self.mode,
+            "version": dataset.version if dataset else None,
+            "built_at": dataset.built_at if dataset else None,
+            "build_seconds": dataset.build_seconds if dataset else None,
+            "rebuilds": self.rebuilds,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+        }
+
+    # --- Internos ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._check()
+            except Exception:
+                self.last_error = traceback.format_exc()
+
+    def _check(self):
+        self.last_check = time.time()
+        signature = data_pipeline.dataset_signature(self.base_dir)
+        current = self._current
+        if current is not None and signature == current.signature:
+            return
+
+        # Espera a cópia terminar: só reconstrói quando a assinatura parar de mudar
+        while not self._stop.is_set():
+            time.sleep(self.settle_seconds)
+            settled = data_pipeline.dataset_signature(self.base_dir)
+            if settled == signature:
+                break
+            signature = settled
+
+        dataset = self._build()
+        if dataset.signature != signature:
+            # Arquivos mudaram durante a leitura: tenta de novo no próximo ciclo
+            self._wake.set()
+        self._swap(dataset)
+
+    def _build(self):
+        if self.use_process:
+            try:
+                if self._executor is None:
+                    # spawn evita fork de um servidor com várias threads
+                    ctx = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+                return self._executor.submit(data_pipeline.build_dataset, self.base_dir).result()
+            except Exception as e:
+                self.last_error = f"Processo de rebuild falhou, usando thread: {e}"
+                self.use_process = False
+                self._executor = None
+        return data_pipeline.build_dataset(self.base_dir)
+
+    def _swap(self, dataset):
+        with self._lock:
+            previous = self._current
+            self._current = dataset
+            if previous is not None:
+                self.rebuilds += 1
+        if self.on_swap is not None:
+            self.on_swap(previous, dataset)
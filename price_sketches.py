@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# Sketches de quantis para Valor_Unitario.
+#
+# Cada preço cai em um bucket logarítmico (mesma ideia do DDSketch): o bucket i
+# cobre (GAMMA^(i-1), GAMMA^i], então qualquer quantil estimado fica a no máximo
+# RELATIVE_ACCURACY do valor exato. Sketches são só contagens por bucket, logo
+# juntar meses/marcas/categorias é somar contagens — dá para montar a distribuição
+# de qualquer seleção de filtros sem voltar às linhas.
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+
+SKETCH_KEYS = ["Ano", "Mes", "Marca", "Categoria"]
+
+# Peso das observações: cada lance conta 1, ou cada resma conta 1
+WEIGHTS = {"Lances": "Por lance", "Volume": "Por volume (resmas)"}
+
+DEFAULT_QUANTILES = {"P10": 0.10, "P50": 0.50, "P90": 0.90}
+
+def normalize_marca(marca):
+    return marca.astype("string").str.strip().str.upper().fillna("SEM MARCA").replace("", "SEM MARCA")
+
+def bucket_index(values):
+    """Índice do bucket logarítmico de cada preço (valores > 0)."""
+    return np.ceil(np.log(np.asarray(values, dtype=float)) / LOG_GAMMA).astype(np.int64)
+
+def bucket_value(index):
+    """Valor representativo do bucket (erro relativo <= RELATIVE_ACCURACY)."""
+    return 2 * GAMMA ** np.asarray(index, dtype=float) / (GAMMA + 1)
+
+def build_price_sketches(df):
+    """
+    Constrói os sketches na ingestão: uma linha por (Ano, Mes, Marca, Categoria, Bucket)
+    com o número de lances e o volume naquele bucket.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=SKETCH_KEYS + ["Bucket", "Lances", "Volume"])
+
+    prices = df["Valor_Unitario"].to_numpy(dtype=float)
+    valid = prices > 0
+    base = pd.DataFrame({
+        "Ano": df["Ano"].to_numpy()[valid],
+        "Mes": df["Mes"].to_numpy()[valid],
+        "Marca": normalize_marca(df["Marca"]).to_numpy()[valid],
+        "Categoria": df["Categoria"].to_numpy()[valid],
+        "Bucket": bucket_index(prices[valid]),
+        "Lances": 1,
+        "Volume": df["Volume"].to_numpy(dtype=float)[valid],
+    })
+    sketches = base.groupby(SKETCH_KEYS + ["Bucket"], as_index=False)[["Lances", "Volume"]].sum()
+    sketches["Marca"] = sketches["Marca"].astype("category")
+    sketches["Categoria"] = sketches["Categoria"].astype("category")
+    return sketches
+
+def select_sketches(sketches, years=None, months=None, marcas=None, categorias=None):
+    """Sketches que atendem aos filtros (None = sem filtro)."""
+    mask = np.ones(len(sketches), dtype=bool)
+    for col, values in (("Ano", years), ("Mes", months), ("Marca", marcas), ("Categoria", categorias)):
+        if values is not None:
+            mask &= sketches[col].isin(list(values)).to_numpy()
+    return sketches[mask]
+
+def merge_sketches(sketches, weight="Lances"):
+    """Junta vários sketches em um só: Series Bucket -> peso, ordenada por bucket."""
+    return sketches.groupby("Bucket")[weight].sum().sort_index()
+
+def quantiles(merged, qs):
+    """Quantis estimados a partir de um sketch combinado (NaN se vazio)."""
+    qs = np.atleast_1d(np.asarray(qs, dtype=float))
+    total = merged.sum() if len(merged) else 0
+    if total <= 0:
+        return np.full(len(qs), np.nan)
+    cum = np.cumsum(merged.to_numpy(dtype=float))
+    pos = np.searchsorted(cum, qs * total, side="left").clip(0, len(cum) - 1)
+    return bucket_value(merged.index.to_numpy()[pos])
+
+def percentile_rank(merged, prices):
+    """Percentual do peso com preço menor ou igual a cada preço informado."""
+    prices = np.atleast_1d(np.asarray(prices, dtype=float))
+    total = merged.sum() if len(merged) else 0
+    out = np.full(len(prices), np.nan)
+    ok = np.isfinite(prices) & (prices > 0)
+    if total <= 0 or not ok.any():
+        return out
+    cum = np.cumsum(merged.to_numpy(dtype=float))
+    pos = np.searchsorted(merged.index.to_numpy(), bucket_index(prices[ok]), side="right") - 1
+    out[ok] = np.where(pos >= 0, cum[pos.clip(0)] / total, 0.0) * 100
+    return out
+
+def price_bands(sketches, by, weight="Lances", qs=None):
+    """
+    Quantis por grupo (ex: by=["Ano", "Mes"] ou ["Marca", "Categoria"]), todos de uma vez:
+    soma os buckets por grupo, acumula dentro do grupo e pega o primeiro bucket
+    que passa de cada quantil.
+    """
+    qs = qs or DEFAULT_QUANTILES
+    columns = list(by) + ["Observacoes"] + list(qs)
+    if sketches.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = sketches.groupby(list(by) + ["Bucket"], observed=True)[weight].sum().reset_index()
+    grouped = grouped[grouped[weight] > 0].sort_values(list(by) + ["Bucket"])
+    g = grouped.groupby(list(by), observed=True, sort=False)[weight]
+    grouped["_cum"] = g.cumsum()
+    grouped["_tot"] = g.transform("sum")
+
+    result = grouped.groupby(list(by), observed=True, sort=False)["_tot"].first().rename("Observacoes").to_frame()
+    for name, q in qs.items():
+        hit = grouped[grouped["_cum"] >= q * grouped["_tot"]]
+        first = hit.groupby(list(by), observed=True, sort=False)["Bucket"].first()
+        result[name] = bucket_value(first.reindex(result.index).to_numpy())
+    return result.reset_index()
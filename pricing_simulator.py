@@ -0,0 +1,127 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from price_sketches import normalize_marca
+
+# Simulador "e se": ajustes de preço por Categoria/Marca/período sobre o cubo
+# (Ano, Mes, Categoria, Marca). Todos os cenários são calculados juntos como
+# matrizes cenário x célula (broadcasting NumPy), sem recalcular o pandas por cenário.
+#
+# Modelo:
+# - Células ajustadas têm preço * (1 + ajuste) e volume * (1 + ajuste) ^ -elasticidade
+#   (elasticidade 0 = só repreço, mesmo volume).
+# - O volume total de cada mês é mantido: o que as células ajustadas ganham ou
+#   perdem sai das demais células do mesmo mês, proporcionalmente ao volume delas.
+
+SCENARIO_KEYS = ["Ano", "Mes", "Categoria", "Marca"]
+OWN_CATEGORIES = ["RDF", "ATUAL"]
+
+def build_scenario_cube(df):
+    """Cubo (Ano, Mes, Categoria, Marca) com Total_Venda e Volume."""
+    if df.empty:
+        return pd.DataFrame(columns=SCENARIO_KEYS + ["Total_Venda", "Volume"])
+    base = df.assign(Marca=normalize_marca(df["Marca"]))
+    return base.groupby(SCENARIO_KEYS, as_index=False)[["Total_Venda", "Volume"]].sum()
+
+def select_cells(cube, years=None, months=None):
+    """Janela de análise (células que entram nos totais)."""
+    mask = np.ones(len(cube), dtype=bool)
+    if years is not None:
+        mask &= cube["Ano"].isin(years).to_numpy()
+    if months is not None:
+        mask &= cube["Mes"].isin(months).to_numpy()
+    return cube[mask].reset_index(drop=True)
+
+def target_mask(cube, categorias=None, marcas=None, years=None, months=None):
+    """Células que recebem um ajuste (None = todas naquela dimensão)."""
+    mask = np.ones(len(cube), dtype=bool)
+    for col, values in (("Categoria", categorias), ("Marca", marcas), ("Ano", years), ("Mes", months)):
+        if values is not None:
+            mask &= cube[col].isin(list(values)).to_numpy()
+    return mask
+
+def scenario_grid(axes):
+    """
+    Produto cartesiano dos eixos. Cada eixo é (nome, máscara das células, valores).
+    Retorna (tabela de cenários S x eixos, matriz de ajustes S x células).
+    Quando eixos se sobrepõem numa célula, os ajustes se somam.
+    """
+    names = [name for name, _, _ in axes]
+    grid = np.array(list(itertools.product(*[np.round(np.asarray(values, dtype=float), 6) for _, _, values in axes])))
+    masks = np.stack([mask for _, mask, _ in axes]).astype(float)  # eixos x células
+    adjustments = grid @ masks                                       # S x células
+    return pd.DataFrame(grid, columns=names), adjustments
+
+def _one_hot(codes, size):
+    out = np.zeros((len(codes), size))
+    out[np.arange(len(codes)), codes] = 1.0
+    return out
+
+def simulate(cube, adjustments, elasticity=0.0):
+    """
+    Avalia todos os cenários. `adjustments` é S x células (fração, -0.1 = 10% mais barato).
+    Retorna dict com receita por categoria (S x K), share do grupo e crescimento anual.
+    """
+    revenue = cube["Total_Venda"].to_numpy(dtype=float)
+    volume = cube["Volume"].to_numpy(dtype=float)
+    price = np.divide(revenue, volume, out=np.zeros_like(revenue), where=volume > 0)
+
+    period_codes, periods = pd.factorize(pd.MultiIndex.from_frame(cube[["Ano", "Mes"]]))
+    cat_codes, categories = pd.factorize(cube["Categoria"])
+    year_codes, years = pd.factorize(cube["Ano"], sort=True)
+    P = _one_hot(period_codes, len(periods))   # células x meses
+    K = _one_hot(cat_codes, len(categories))   # células x categorias
+    Y = _one_hot(year_codes, len(years))       # células x anos
+
+    factor = 1.0 + adjustments                                   # S x C
+    adjusted = adjustments != 0
+    adjusted_volume = volume * np.power(np.clip(factor, 1e-6, None), -elasticity)
+
+    # Volume que muda de mãos em cada mês, absorvido pelas células não ajustadas
+    delta_p = np.where(adjusted, adjusted_volume - volume, 0.0) @ P      # S x meses
+    absorb_p = np.where(adjusted, 0.0, volume) @ P                       # S x meses
+    ratio_p = np.divide(delta_p, absorb_p, out=np.zeros_like(delta_p), where=absorb_p > 0).clip(None, 1.0)
+    new_volume = np.where(adjusted, adjusted_volume, volume * (1.0 - ratio_p @ P.T))
+
+    new_revenue = new_volume * price * factor                   # S x C
+    revenue_by_cat = new_revenue @ K                            # S x K
+
+    own = np.isin(np.asarray(categories), OWN_CATEGORIES).astype(float)
+    own_revenue = revenue_by_cat @ own
+    total_revenue = revenue_by_cat.sum(axis=1)
+    share = np.divide(own_revenue, total_revenue, out=np.zeros_like(own_revenue), where=total_revenue > 0) * 100
+
+    growth = np.full(len(adjustments), np.nan)
+    if len(years) >= 2:
+        own_by_year = (new_revenue * (cube["Categoria"].isin(OWN_CATEGORIES).to_numpy())) @ Y  # S x anos
+        prev, last = own_by_year[:, -2], own_by_year[:, -1]
+        growth = np.divide(last - prev, prev, out=np.full_like(prev, np.nan), where=prev > 0) * 100
+
+    return {
+        "categories": list(categories),
+        "revenue_by_category": revenue_by_cat,
+        "own_revenue": own_revenue,
+        "total_revenue": total_revenue,
+        "share": share,
+        "growth": growth,
+        "growth_years": (int(years[-2]), int(years[-1])) if len(years) >= 2 else None,
+    }
+
+def run_scenarios(cube, axes, elasticity=0.0):
+    """Grade de cenários + resultados em um dataframe (uma linha por cenário)."""
+    grid, adjustments = scenario_grid(axes)
+    result = simulate(cube, adjustments, elasticity)
+    base = simulate(cube, np.zeros((1, len(cube))), elasticity)
+
+    table = grid * 100  # ajustes em %
+    for i, cat in enumerate(result["categories"]):
+        table[f"Receita {cat}"] = result["revenue_by_category"][:, i]
+    table["Receita RDF+ATUAL"] = result["own_revenue"]
+    table["Share RDF+ATUAL (%)"] = result["share"]
+    table["Δ Share (p.p.)"] = result["share"] - base["share"][0]
+    if result["growth_years"]:
+        prev, last = result["growth_years"]
+        table[f"Crescimento {last}/{prev} (%)"] = result["growth"]
+    return table, base
@@ -0,0 +1,258 @@
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import data_pipeline
+import competitor_ranking
+from dataset_watcher import DatasetWatcher
+
+# API local somente leitura (HTTP/JSON) com os mesmos números do dashboard.
+#
+# As consultas leem o cubo e os pré-agregados da versão atual do dataset,
+# mantida pelo DatasetWatcher; nada de Excel é lido por requisição. Respostas
+# ficam em cache por (versão, rota, parâmetros) e levam um ETag derivado da
+# versão, então clientes com If-None-Match recebem 304 até os dados mudarem.
+#
+# Uso: python query_api.py --port 8765
+#      curl "http://127.0.0.1:8765/kpis?anos=2025&meses=1,2,3"
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_SIZE = 256
+
+OWN_CATEGORIES = ["RDF", "ATUAL"]
+
+class BadRequest(ValueError):
+    pass
+
+def _int_list(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        return [int(v) for v in ",".join(raw).split(",") if v.strip()]
+    except ValueError:
+        raise BadRequest(f"Parâmetro '{name}' deve ser uma lista de inteiros separados por vírgula")
+
+def _str_list(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    return [v.strip().upper() for v in ",".join(raw).split(",") if v.strip()]
+
+def _records(df):
+    """DataFrame -> lista de dicts serializável (NaN vira null)."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(value)
+    raise TypeError(f"Tipo não serializável: {type(value)}")
+
+def filter_cube(cube, years=None, months=None):
+    mask = np.ones(len(cube), dtype=bool)
+    if years is not None:
+        mask &= cube["Ano"].isin(years).to_numpy()
+    if months is not None:
+        mask &= cube["Mes"].isin(months).to_numpy()
+    return cube[mask]
+
+# --- Consultas (mesma lógica dos KPIs/gráficos do dashboard) ---
+
+def query_kpis(dataset, params):
+    cube = filter_cube(dataset.sales_cube, _int_list(params, "anos"), _int_list(params, "meses"))
+    total_market = float(cube["Total_Venda"].sum())
+    total_mine = float(cube.loc[cube["Categoria"].isin(OWN_CATEGORIES), "Total_Venda"].sum())
+    total_others = float(cube.loc[cube["Categoria"] == "OUTROS", "Total_Venda"].sum())
+    result = {
+        "vendas_totais": total_market,
+        "vendas_rdf_atual": total_mine,
+        "vendas_outras": total_others,
+        "share_rdf_atual": (total_mine / total_market * 100) if total_market else 0.0,
+        "volume_total": float(cube["Volume"].sum()),
+        "linhas": int(cube["Linhas"].sum()),
+    }
+    # Crescimento do grupo entre o último ano e o anterior da seleção, só nos
+    # meses que o último ano já tem (mesma comparação do dashboard)
+    own = cube[cube["Categoria"].isin(OWN_CATEGORIES)]
+    last_months = own.loc[own["Ano"] == own["Ano"].max(), "Mes"].unique()
+    by_year = own[own["Mes"].isin(last_months)].groupby("Ano")["Total_Venda"].sum()
+    if len(by_year) >= 2 and by_year.iloc[-2]:
+        result["crescimento_rdf_atual"] = float((by_year.iloc[-1] - by_year.iloc[-2]) / by_year.iloc[-2] * 100)
+    return result
+
+def query_monthly(dataset, params):
+    cube = filter_cube(dataset.sales_cube, _int_list(params, "anos"), _int_list(params, "meses"))
+    return _records(cube.sort_values(["Ano", "Mes", "Categoria"]))
+
+def query_share(dataset, params):
+    cube = filter_cube(dataset.sales_cube, _int_list(params, "anos"), _int_list(params, "meses"))
+    by_cat = cube.groupby("Categoria", as_index=False)["Total_Venda"].sum()
+    total = by_cat["Total_Venda"].sum()
+    by_cat["Share"] = by_cat["Total_Venda"] / total * 100 if total else 0.0
+    return _records(by_cat)
+
+def query_ranking(dataset, params):
+    metric = (params.get("metrica") or ["Receita"])[0]
+    if metric not in competitor_ranking.METRICS:
+        raise BadRequest(f"metrica deve ser uma de {list(competitor_ranking.METRICS)}")
+    try:
+        n = int((params.get("n") or ["10"])[0])
+    except ValueError:
+        raise BadRequest("n deve ser inteiro")
+    include_own = (params.get("incluir_proprias") or ["1"])[0].lower() not in ("0", "false", "nao", "não")
+    months = _int_list(params, "meses")
+    compare_years = _int_list(params, "comparar_anos")
+    ranking = competitor_ranking.competitor_ranking(
+        dataset.competitor_aggregates, metric=metric, n=max(1, min(n, 500)),
+        years=_int_list(params, "anos"), months=months, marcas=_str_list(params, "marcas"),
+        include_own=include_own, compare_years=compare_years,
+        compare_months=months if compare_years else None
+    )
+    return _records(ranking)
+
+def query_tender(dataset, params):
+    pregao = (params.get("numero") or [None])[0]
+    start = (params.get("data_inicio") or [None])[0]
+    end = (params.get("data_fim") or [None])[0]
+    if not (pregao or start or end):
+        raise BadRequest("Informe numero e/ou data_inicio/data_fim (AAAA-MM-DD)")
+    try:
+        rows = dataset.tender_index.lookup(pregao=pregao, start=start, end=end)
+    except ValueError:
+        raise BadRequest("Datas devem estar no formato AAAA-MM-DD")
+    columns = ["Pregao", "Data_Evento", "Orgao", "Empresa", "Marca", "Valor_Unitario", "Volume", "Total_Venda", "Categoria", "Origem", "Aba"]
+    return _records(rows[columns])
+
+def query_version(dataset, params):
+    return {"versao": dataset.version, "gerado_em": dataset.built_at, "linhas": int(len(dataset.df))}
+
+ROUTES = {
+    "/versao": query_version,
+    "/kpis": query_kpis,
+    "/mensal": query_monthly,
+    "/share": query_share,
+    "/ranking": query_ranking,
+    "/pregao": query_tender,
+}
+
+class QueryService:
+    """Resolve rotas contra a versão atual do dataset, com cache de respostas por versão."""
+
+    def __init__(self, get_dataset, cache_size=CACHE_SIZE):
+        self.get_dataset = get_dataset
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_version = None
+        self._lock = threading.Lock()
+
+    def handle(self, path, query):
+        """Devolve (status, corpo em bytes, etag)."""
+        route = ROUTES.get(path.rstrip("/") or "/")
+        if route is None:
+            return 404, self._error(f"Rota desconhecida: {path}. Disponíveis: {sorted(ROUTES)}"), None
+
+        # A referência é lida uma vez: a requisição inteira usa a mesma versão
+        dataset = self.get_dataset()
+        if dataset is None:
+            return 503, self._error("Dataset ainda não carregado"), None
+
+        params = parse_qs(query)
+        canonical = json.dumps(sorted((k, sorted(v)) for k, v in params.items()))
+        key = (path, canonical)
+
+        with self._lock:
+            if self._cache_version != dataset.version:
+                self._cache.clear()
+                self._cache_version = dataset.version
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return 200, hit[0], hit[1]
+
+        try:
+            payload = route(dataset, params)
+        except BadRequest as e:
+            return 400, self._error(str(e)), None
+
+        body = json.dumps({"versao": dataset.version, "dados": payload}, default=_json_default, ensure_ascii=False).encode("utf-8")
+        etag = '"%s-%s"' % (dataset.version, hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:10])
+
+        with self._lock:
+            if self._cache_version == dataset.version:
+                self._cache[key] = (body, etag)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return 200, body, etag
+
+    @staticmethod
+    def _error(message):
+        return json.dumps({"erro": message}, ensure_ascii=False).encode("utf-8")
+
+class QueryHandler(BaseHTTPRequestHandler):
+    server_version = "AnaliseVendasAPI/1.0"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        status, body, etag = self.server.query_service.handle(parts.path, parts.query)
+
+        if etag is not None and etag in (self.headers.get("If-None-Match") or ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def create_server(get_dataset, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Cria o servidor (uma thread por requisição). `get_dataset` devolve o Dataset
+    atual — normalmente `watcher.current`. Use port=0 para uma porta livre.
+    """
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    server.query_service = QueryService(get_dataset)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="API local de consultas sobre o dataset de vendas")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--base-dir", default=data_pipeline.BASE_DIR)
+    args = parser.parse_args()
+
+    print(f"Carregando planilhas de {args.base_dir}...")
+    watcher = DatasetWatcher(args.base_dir).start()
+    server = create_server(watcher.current, args.host, args.port)
+    print(f"API em http://{args.host}:{server.server_address[1]} (versão {watcher.current().version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        watcher.stop()
+
+if __name__ == "__main__":
+    main()
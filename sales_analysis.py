@@ -5,6 +5,9 @@ import matplotlib.pyplot as plt
 import glob
 import re
 import warnings
+import argparse
+
+import sales_forecast
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -52,9 +55,8 @@ def dedup_columns(columns):
             new_cols.append(col)
     return new_cols
 
-def load_data():
-    all_data = []
-
+def iter_sheets():
+    """Lê as abas mensais uma a uma (gera um dataframe por aba)."""
     for info in FILES_INFO:
         path = os.path.join(BASE_DIR, info["file"])
         if not os.path.exists(path):
@@ -113,21 +115,26 @@ def load_data():
                     subset_df = df[final_cols_in_df].copy()
                     subset_df["Ano"] = info["year"]
                     subset_df["Mes"] = month_num
-                    all_data.append(subset_df)
+                    del df # Libera a aba completa antes de entregar o recorte
+                    yield subset_df
                     
         except Exception as e:
             print(f"  ERROR processing {info['file']}: {e}")
 
+def load_data():
+    all_data = list(iter_sheets())
+
     if not all_data:
         return pd.DataFrame() 
 
     full_df = pd.concat(all_data, ignore_index=True)
     return full_df
 
-def clean_and_filter(df):
+def clean_and_filter(df, verbose=True):
     if df.empty: return df
         
-    print(f"\nTotal rows loaded: {len(df)}")
+    if verbose:
+        print(f"\nTotal rows loaded: {len(df)}")
     
     # Filter Company
     df["Empresa_Clean"] = df["Empresa"].astype(str).str.upper().fillna("")
@@ -149,7 +156,8 @@ def clean_and_filter(df):
         lambda x: "ATUAL" if "ATUAL" in x else ("RDF" if "RD" in x or "R.D.F" in x else x)
     )
     
-    print(f"Rows after filtering companies: {len(filtered_df)}")
+    if verbose:
+        print(f"Rows after filtering companies: {len(filtered_df)}")
     
     # Clean Numbers
     def clean_money(val):
@@ -186,15 +194,31 @@ def clean_and_filter(df):
     
     return filtered_df
 
+AGG_KEYS = ["Ano", "Mes", "Empresa_Final"]
+
+def reduce_sales(df):
+    """Agregado parcial (Ano, Mes, Empresa_Final) com Total_Venda e Volume."""
+    return df.groupby(AGG_KEYS)[["Total_Venda", "Volume"]].sum()
+
+def merge_partials(partials):
+    """Junta os agregados parciais de cada aba no agregado final."""
+    if not partials:
+        return pd.DataFrame()
+    return pd.concat(partials).groupby(level=AGG_KEYS).sum().reset_index()
+
 def generate_visualizations(df):
     if df.empty: return
+    generate_report(reduce_sales(df).reset_index())
+
+def generate_report(agg):
+    """Gráficos e relatório a partir do agregado (Ano, Mes, Empresa_Final)."""
+    if agg.empty: return
     
     # Ensure directory
     os.makedirs("analysis_output", exist_ok=True)
     
     # Aggregation
-    monthly_sales = df.groupby(["Ano", "Mes", "Empresa_Final"])["Total_Venda"].sum().reset_index()
-    monthly_vol = df.groupby(["Ano", "Mes", "Empresa_Final"])["Volume"].sum().reset_index()
+    monthly_sales = agg[AGG_KEYS + ["Total_Venda"]]
     
     # Pivot for plotting
     pivot_sales = monthly_sales.pivot_table(index=["Ano", "Mes"], columns="Empresa_Final", values="Total_Venda", fill_value=0)
@@ -217,7 +241,7 @@ def generate_visualizations(df):
     
     # Plot 2: Total Volume Comparison
     plt.figure(figsize=(10, 6))
-    summary_vol = df.groupby(["Ano", "Empresa_Final"])["Volume"].sum().unstack(fill_value=0)
+    summary_vol = agg.groupby(["Ano", "Empresa_Final"])["Volume"].sum().unstack(fill_value=0)
     summary_vol.plot(kind='bar', figsize=(10, 6))
     plt.title('Volume Total de Vendas por Ano e Empresa')
     plt.ylabel('Volume (Unidades/Resmas)')
@@ -230,19 +254,69 @@ def generate_visualizations(df):
     with open(OUTPUT_FILE, "w") as f:
         f.write("=== RELATÓRIO DE ANÁLISE DE VENDAS ===\n\n")
         f.write("1. TOTAIS GERAIS\n")
-        total_sales = df.groupby("Empresa_Final")["Total_Venda"].sum()
+        total_sales = agg.groupby("Empresa_Final")["Total_Venda"].sum()
         f.write(str(total_sales) + "\n\n")
         
-        f.write("2. COMPARAÇÃO 2024 vs 2025 (Jan-Jun)\n")
-        # Filter for first half to be fair comparison if 2025 is incomplete? 2025 is full year?
-        # User implies "2024 vs 2025", 2025 likely current/partial.
-        # Let's show data as is.
-        y_group = df.groupby("Ano")["Total_Venda"].sum()
+        f.write("2. COMPARAÇÃO ANUAL (mesmos meses)\n")
+        # O último ano pode estar incompleto: compara só os meses que ele já tem
+        last_year = agg["Ano"].max()
+        last_months = sorted(agg.loc[agg["Ano"] == last_year, "Mes"].unique())
+        f.write(f"Meses considerados: {', '.join(str(m) for m in last_months)}\n")
+        y_group = agg[agg["Mes"].isin(last_months)].groupby("Ano")["Total_Venda"].sum()
         f.write(str(y_group) + "\n\n")
         
+        remaining = 12 - max(last_months)
+        if remaining:
+            f.write(f"3. PROJEÇÃO DOS {remaining} MESES RESTANTES DE {last_year} (P10-P90)\n")
+            projection = sales_forecast.forecast_monthly(agg, ["Empresa_Final"], horizon=remaining)
+            projection = sales_forecast.aggregate_forecast(projection.rename(columns={"Empresa_Final": "Empresa"}), ["Empresa"])
+            f.write(projection[["Empresa", "Ano", "Mes", "Previsao", "P10", "P90"]].to_string(index=False, float_format=lambda v: f"{v:,.2f}") + "\n\n")
+            full_year = agg.loc[agg["Ano"] == last_year, "Total_Venda"].sum() + projection["Previsao"].sum()
+            f.write(f"Total projetado {last_year}: R$ {full_year:,.2f}\n\n")
+        
     print(f"Report saved: {OUTPUT_FILE}")
 
+def main_low_memory():
+    """
+    Map-reduce por aba: cada aba é limpa e reduzida a (Ano, Mes, Empresa_Final)
+    assim que lida, e o dataframe bruto é descartado. O pico de memória fica no
+    tamanho de uma aba, não do histórico inteiro.
+    """
+    partials = []
+    rows_loaded = rows_kept = 0
+    for sheet_df in iter_sheets():
+        # No modo completo o concat preenche colunas ausentes com NaN; aqui fazemos o mesmo por aba
+        for col in ("Empresa", "Valor_Unitario"):
+            if col not in sheet_df.columns:
+                sheet_df[col] = None
+        rows_loaded += len(sheet_df)
+        clean_df = clean_and_filter(sheet_df, verbose=False)
+        del sheet_df
+        rows_kept += len(clean_df)
+        if not clean_df.empty:
+            partials.append(reduce_sales(clean_df))
+        del clean_df
+    
+    print(f"\nTotal rows loaded: {rows_loaded}")
+    print(f"Rows after filtering companies: {rows_kept}")
+    
+    agg = merge_partials(partials)
+    if not agg.empty:
+        print("\n--- DATA AGGREGATED ---")
+        print(agg.head())
+        generate_report(agg)
+    else:
+        print("No data found after processing.")
+
 def main():
+    parser = argparse.ArgumentParser(description="Relatório de vendas RDF/ATUAL")
+    parser.add_argument("--low-memory", action="store_true", help="limpa e agrega cada aba ao ler, sem montar o dataframe completo")
+    args = parser.parse_args()
+    
+    if args.low_memory:
+        main_low_memory()
+        return
+    
     df = load_data()
     clean_df = clean_and_filter(df)
     
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+from competitor_ranking import normalize_empresa
+from price_sketches import normalize_marca
+
+# Projeção mensal de vendas para todas as séries (Categoria, Empresa, Marca) de
+# uma vez. As séries viram uma matriz série x mês e o modelo sazonal simples é
+# ajustado com operações NumPy sobre a matriz inteira, sem loop por série.
+#
+# Modelo (aditivo, por série):
+# - valor do mês = nível do ano + sazonalidade do mês; os dois são ajustados
+#   alternadamente (mínimos quadrados), então um ano incompleto não distorce a
+#   sazonalidade e um mês visto em um só ano mantém seu desvio
+# - nível: média dessazonalizada do último ciclo (12 meses)
+# - previsão = nível + sazonalidade do mês (mínimo 0)
+# - faixa P10-P90: +/- 1,28 desvio-padrão dos resíduos, alargando com o horizonte
+# Meses sem venda dentro do período observado contam como zero.
+
+FORECAST_KEYS = ["Categoria", "Empresa", "Marca"]
+MAX_HORIZON = 12
+BAND_Z = 1.2816  # P10-P90 da normal
+FORECAST_COLUMNS = ["Ano", "Mes", "Horizonte", "Previsao", "Sigma"]
+FIT_ITERATIONS = 50
+
+def monthly_matrix(monthly, keys, value="Total_Venda"):
+    """
+    Matriz série x mês (de primeiro a último mês observado, meses vazios = 0).
+    Retorna (chaves das séries, ordinal do primeiro mês, matriz).
+    """
+    ordinal = monthly["Ano"].to_numpy(dtype=np.int64) * 12 + monthly["Mes"].to_numpy(dtype=np.int64) - 1
+    first, last = ordinal.min(), ordinal.max()
+    codes, series = pd.factorize(pd.MultiIndex.from_frame(monthly[keys]))
+    matrix = np.zeros((len(series), last - first + 1))
+    np.add.at(matrix, (codes, ordinal - first), monthly[value].to_numpy(dtype=float))
+    return pd.DataFrame(list(series), columns=keys), first, matrix
+
+def fit_seasonal(matrix, first, iterations=FIT_ITERATIONS):
+    """Ajusta nível, sazonalidade (S x 12) e desvio dos resíduos de todas as séries."""
+    n_series, n_months = matrix.shape
+    pad_left = first % 12
+    pad_right = -(pad_left + n_months) % 12
+    padded = np.pad(matrix, ((0, 0), (pad_left, pad_right)), constant_values=np.nan)
+    by_year = padded.reshape(n_series, -1, 12)                         # S x anos x 12
+
+    observed = ~np.isnan(by_year[0])                                   # anos x 12, igual para todas
+    months_per_year = observed.sum(axis=1)                             # >= 1 em todo ano
+    years_per_month = observed.sum(axis=0)
+    seen = years_per_month > 0
+
+    # Nível por ano e sazonalidade por mês, alternando até convergir
+    seasonal = np.zeros((n_series, 12))
+    for _ in range(iterations):
+        year_level = np.nansum(by_year - seasonal[:, None, :], axis=2) / months_per_year      # S x anos
+        seasonal = np.nansum(by_year - year_level[:, :, None], axis=1) / np.maximum(years_per_month, 1)
+        seasonal -= seasonal[:, seen].mean(axis=1, keepdims=True)
+        seasonal[:, ~seen] = 0.0
+
+    month_of_year = (first + np.arange(n_months)) % 12
+    deseasonalized = matrix - seasonal[:, month_of_year]
+    level = deseasonalized[:, -12:].mean(axis=1)
+
+    fitted = (year_level[:, :, None] + seasonal[:, None, :]).reshape(n_series, -1)[:, pad_left:pad_left + n_months]
+    residuals = matrix - fitted
+    dof = n_months - len(months_per_year) - (seen.sum() - 1)
+    if dof > 0:
+        sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+    else:
+        # Modelo sem graus de liberdade (até um ano de dados): usa a dispersão da própria série
+        sigma = matrix.std(axis=1, ddof=1) if n_months > 1 else np.zeros(n_series)
+    return level, seasonal, sigma
+
+def check_seasonal_fit():
+    """
+    Conferência do modelo: uma série puramente sazonal, com o ano atual
+    incompleto, deve ser reproduzida nos meses que faltam.
+    """
+    months = np.arange(1, 13)
+    pattern = 100 + 10 * months + np.array([0, 5, -5, 30, 0, -20, 15, 0, 10, -10, 25, -50])
+    history = pd.DataFrame({
+        "Serie": "A",
+        "Ano": np.r_[np.full(12, 2024), np.full(8, 2025)],
+        "Mes": np.r_[months, months[:8]],
+        "Total_Venda": np.r_[pattern, pattern[:8]],
+    })
+    forecast = forecast_monthly(history, ["Serie"], horizon=4)
+    assert forecast["Mes"].tolist() == [9, 10, 11, 12]
+    assert np.allclose(forecast["Previsao"], pattern[8:]), forecast["Previsao"].tolist()
+    assert np.allclose(forecast["Sigma"], 0)
+    return forecast
+
+def forecast_monthly(monthly, keys, value="Total_Venda", horizon=MAX_HORIZON):
+    """
+    Projeta `horizon` meses após o último mês observado para cada série `keys`.
+    `monthly` tem keys + Ano + Mes + value (várias linhas por mês são somadas).
+    Retorna uma linha por série e mês projetado: keys + Ano, Mes, Horizonte, Previsao, Sigma.
+    """
+    if monthly.empty or horizon <= 0:
+        return pd.DataFrame(columns=keys + FORECAST_COLUMNS)
+
+    series, first, matrix = monthly_matrix(monthly, keys, value)
+    level, seasonal, sigma = fit_seasonal(matrix, first)
+
+    steps = np.arange(1, horizon + 1)
+    ordinal = first + matrix.shape[1] - 1 + steps
+    prediction = np.clip(level[:, None] + seasonal[:, ordinal % 12], 0, None)   # S x H
+    spread = sigma[:, None] * np.sqrt(1 + steps / 12)                            # S x H
+
+    out = series.loc[np.repeat(np.arange(len(series)), horizon)].reset_index(drop=True)
+    out["Ano"] = np.tile(ordinal // 12, len(series))
+    out["Mes"] = np.tile(ordinal % 12 + 1, len(series))
+    out["Horizonte"] = np.tile(steps, len(series))
+    out["Previsao"] = prediction.ravel()
+    out["Sigma"] = spread.ravel()
+    return out[(out["Previsao"] > 0) | (out["Sigma"] > 0)].reset_index(drop=True)
+
+def build_forecasts(df, horizon=MAX_HORIZON):
+    """Projeção de Total_Venda por (Categoria, Empresa, Marca), calculada na ingestão."""
+    if df.empty:
+        return pd.DataFrame(columns=FORECAST_KEYS + FORECAST_COLUMNS)
+    monthly = pd.DataFrame({
+        "Categoria": df["Categoria"].to_numpy(),
+        "Empresa": normalize_empresa(df["Empresa_Clean"]).to_numpy(),
+        "Marca": normalize_marca(df["Marca"]).to_numpy(),
+        "Ano": df["Ano"].to_numpy(),
+        "Mes": df["Mes"].to_numpy(),
+        "Total_Venda": df["Total_Venda"].to_numpy(dtype=float),
+    })
+    return forecast_monthly(monthly, FORECAST_KEYS, horizon=horizon)
+
+def remaining_months(df):
+    """Meses que faltam para fechar o último ano observado."""
+    if df.empty:
+        return 0
+    last_year = df["Ano"].max()
+    return int(12 - df.loc[df["Ano"] == last_year, "Mes"].max())
+
+def aggregate_forecast(forecasts, by, horizon=None, empresas=None):
+    """
+    Soma as projeções por `by` + mês. O desvio agregado supõe séries independentes
+    (raiz da soma das variâncias). Acrescenta Periodo, P10 e P90.
+    """
+    selected = forecasts
+    if horizon is not None:
+        selected = selected[selected["Horizonte"] <= horizon]
+    if empresas:
+        selected = selected[selected["Empresa"].isin(empresas)]
+    grouped = selected.assign(Variancia=selected["Sigma"] ** 2).groupby(by + ["Ano", "Mes"], as_index=False)[["Previsao", "Variancia"]].sum()
+    spread = BAND_Z * np.sqrt(grouped.pop("Variancia"))
+    grouped["P10"] = (grouped["Previsao"] - spread).clip(lower=0)
+    grouped["P90"] = grouped["Previsao"] + spread
+    grouped["Periodo"] = pd.to_datetime(pd.DataFrame({"year": grouped["Ano"], "month": grouped["Mes"], "day": 1}))
+    return grouped.sort_values(by + ["Periodo"]).reset_index(drop=True)
+
+if __name__ == "__main__":
+    print(check_seasonal_fit()[["Ano", "Mes", "Previsao"]].to_string(index=False))
+    print("OK: série sazonal reproduzida")
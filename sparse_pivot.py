@@ -0,0 +1,211 @@
+import argparse
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from competitor_ranking import normalize_empresa
+from price_sketches import normalize_marca
+
+# Tabela dinâmica esparsa para drill-down em qualquer combinação de
+# Ano, Mes, Categoria, Empresa e Marca.
+#
+# Na ingestão o dataset vira um armazenamento em coordenadas (COO): um vetor de
+# códigos inteiros por dimensão + os valores, só para as combinações que
+# existem. Cruzamentos, totais e subtotais são somas (bincount) sobre esses
+# vetores; a matriz densa é montada apenas para a janela visível (linhas x
+# colunas da página), nunca para o cruzamento inteiro.
+#
+# Uso: python sparse_pivot.py --linhas Empresa Marca --colunas Ano
+#      python sparse_pivot.py --linhas Marca --colunas Mes --anos 2025 --medida Volume --offset 20
+
+PIVOT_DIMENSIONS = ["Ano", "Mes", "Categoria", "Empresa", "Marca"]
+MEASURES = {"Total_Venda": "Receita (R$)", "Volume": "Volume", "Linhas": "Lances"}
+TOTAL_LABEL = "Total"
+
+@dataclass
+class PivotResult:
+    table: pd.DataFrame          # janela densa (linhas x colunas visíveis)
+    row_totals: pd.Series        # total de cada linha visível (todas as colunas)
+    col_totals: pd.Series        # total de cada coluna visível (todas as linhas)
+    subtotals: pd.DataFrame      # 1ª dimensão das linhas x colunas visíveis (vazio com uma dimensão)
+    grand_total: float
+    n_rows: int                  # linhas no cruzamento completo
+    n_cols: int
+    n_cells: int                 # células não vazias no cruzamento completo
+
+class PivotStore:
+    """Agregado esparso (COO) por todas as dimensões de PIVOT_DIMENSIONS."""
+
+    def __init__(self, df):
+        if df.empty:
+            self.labels = {dim: np.array([], dtype=object) for dim in PIVOT_DIMENSIONS}
+            self.codes = {dim: np.array([], dtype=np.int64) for dim in PIVOT_DIMENSIONS}
+            self.values = {measure: np.array([], dtype=float) for measure in MEASURES}
+            return
+
+        base = pd.DataFrame({
+            "Ano": df["Ano"].to_numpy(),
+            "Mes": df["Mes"].to_numpy(),
+            "Categoria": df["Categoria"].to_numpy(),
+            "Empresa": normalize_empresa(df["Empresa_Clean"]).to_numpy(),
+            "Marca": normalize_marca(df["Marca"]).to_numpy(),
+            "Total_Venda": df["Total_Venda"].to_numpy(dtype=float),
+            "Volume": df["Volume"].to_numpy(dtype=float),
+        })
+        cells = base.groupby(PIVOT_DIMENSIONS, as_index=False, sort=False).agg(
+            Total_Venda=("Total_Venda", "sum"), Volume=("Volume", "sum"), Linhas=("Total_Venda", "size")
+        )
+
+        self.labels, self.codes = {}, {}
+        for dim in PIVOT_DIMENSIONS:
+            codes, labels = pd.factorize(cells[dim], sort=True)
+            self.codes[dim] = codes.astype(np.int64)
+            self.labels[dim] = np.asarray(labels)
+        self.values = {measure: cells[measure].to_numpy(dtype=float) for measure in MEASURES}
+
+    def __len__(self):
+        return len(self.values["Total_Venda"])
+
+    def options(self, dim):
+        return list(self.labels[dim])
+
+    def _mask(self, filters):
+        mask = np.ones(len(self), dtype=bool)
+        for dim, values in (filters or {}).items():
+            if values is None:
+                continue
+            allowed = np.isin(self.labels[dim], list(values))
+            mask &= allowed[self.codes[dim]]
+        return mask
+
+    def _keys(self, dims, mask):
+        """Chave combinada das dimensões -> (id por célula, rótulos de cada id)."""
+        sizes = [max(len(self.labels[dim]), 1) for dim in dims]
+        combined = np.ravel_multi_index([self.codes[dim][mask] for dim in dims], sizes)
+        keys, ids = np.unique(combined, return_inverse=True)
+        parts = np.unravel_index(keys, sizes)
+        index = pd.MultiIndex.from_arrays([self.labels[dim][part] for dim, part in zip(dims, parts)], names=dims)
+        return ids, index
+
+    def crosstab(self, rows, cols, measure="Total_Venda", filters=None,
+                 row_offset=0, row_limit=50, col_offset=0, col_limit=24, sort_rows="total"):
+        """
+        Cruzamento de `rows` x `cols` (listas de dimensões) sobre as células filtradas.
+        Só a janela [row_offset, row_offset + row_limit) x [col_offset, col_offset + col_limit)
+        vira matriz densa. sort_rows: "total" (maior primeiro) ou "rotulo".
+        """
+        overlap = set(rows) & set(cols)
+        if overlap or not rows or not cols:
+            raise ValueError("Escolha ao menos uma dimensão de linha e uma de coluna, sem repetir dimensões")
+
+        mask = self._mask(filters)
+        values = self.values[measure][mask]
+        row_ids, row_index = self._keys(rows, mask)
+        col_ids, col_index = self._keys(cols, mask)
+        n_rows, n_cols = len(row_index), len(col_index)
+
+        row_totals = np.bincount(row_ids, weights=values, minlength=n_rows)
+        col_totals = np.bincount(col_ids, weights=values, minlength=n_cols)
+        row_order = np.argsort(-row_totals, kind="stable") if sort_rows == "total" else np.arange(n_rows)
+
+        visible_rows = row_order[row_offset:row_offset + row_limit]
+        visible_cols = np.arange(n_cols)[col_offset:col_offset + col_limit]
+        row_pos = np.full(n_rows, -1)
+        row_pos[visible_rows] = np.arange(len(visible_rows))
+        col_pos = np.full(n_cols, -1)
+        col_pos[visible_cols] = np.arange(len(visible_cols))
+
+        # Só as células da janela são escritas na matriz densa
+        in_window = (row_pos[row_ids] >= 0) & (col_pos[col_ids] >= 0)
+        dense = np.zeros((len(visible_rows), len(visible_cols)))
+        np.add.at(dense, (row_pos[row_ids[in_window]], col_pos[col_ids[in_window]]), values[in_window])
+
+        window_rows = row_index[visible_rows]
+        window_cols = col_index[visible_cols]
+        table = pd.DataFrame(dense, index=window_rows, columns=window_cols)
+
+        subtotals = pd.DataFrame()
+        if len(rows) > 1:
+            # Subtotal da 1ª dimensão das linhas, para os grupos que aparecem na janela
+            first = self.codes[rows[0]][mask]
+            groups = np.unique(first[np.isin(row_ids, visible_rows)])
+            group_pos = np.full(len(self.labels[rows[0]]), -1)
+            group_pos[groups] = np.arange(len(groups))
+            in_groups = (group_pos[first] >= 0) & (col_pos[col_ids] >= 0)
+            sub = np.zeros((len(groups), len(visible_cols)))
+            np.add.at(sub, (group_pos[first[in_groups]], col_pos[col_ids[in_groups]]), values[in_groups])
+            group_totals = np.bincount(first, weights=values, minlength=len(self.labels[rows[0]]))[groups]
+            subtotals = pd.DataFrame(sub, index=pd.Index(self.labels[rows[0]][groups], name=rows[0]), columns=window_cols)
+            subtotals[TOTAL_LABEL] = group_totals
+
+        return PivotResult(
+            table=table,
+            row_totals=pd.Series(row_totals[visible_rows], index=window_rows, name=TOTAL_LABEL),
+            col_totals=pd.Series(col_totals[visible_cols], index=window_cols, name=TOTAL_LABEL),
+            subtotals=subtotals,
+            grand_total=float(values.sum()),
+            n_rows=n_rows,
+            n_cols=n_cols,
+            n_cells=int(len(np.unique(row_ids * n_cols + col_ids))),
+        )
+
+def build_pivot_store(df):
+    return PivotStore(df)
+
+def flat_columns(table):
+    """Colunas com várias dimensões viram rótulos "2025 / 3"."""
+    table = table.copy()
+    table.columns = [" / ".join(str(part) for part in col if part != "") if isinstance(col, tuple) else str(col) for col in table.columns]
+    return table
+
+def with_totals(result):
+    """Janela com coluna e linha de Total (para exibição)."""
+    table = flat_columns(result.table)
+    table[TOTAL_LABEL] = result.row_totals.to_numpy()
+    # Rótulos como texto: a linha "Total" não pode cair num nível inteiro (Ano/Mes)
+    table.index = pd.MultiIndex.from_arrays(
+        [table.index.get_level_values(i).astype(str) for i in range(table.index.nlevels)], names=table.index.names
+    )
+    total_label = (TOTAL_LABEL,) + ("",) * (table.index.nlevels - 1)
+    table.loc[total_label, :] = result.col_totals.tolist() + [result.grand_total]
+    return table
+
+def main(argv=None):
+    import data_pipeline
+
+    parser = argparse.ArgumentParser(description="Tabela dinâmica (drill-down) sobre o dataset de vendas")
+    parser.add_argument("--linhas", nargs="+", choices=PIVOT_DIMENSIONS, default=["Empresa"])
+    parser.add_argument("--colunas", nargs="+", choices=PIVOT_DIMENSIONS, default=["Ano"])
+    parser.add_argument("--medida", choices=list(MEASURES), default="Total_Venda")
+    parser.add_argument("--anos", type=int, nargs="*")
+    parser.add_argument("--meses", type=int, nargs="*")
+    parser.add_argument("--categorias", nargs="*")
+    parser.add_argument("--offset", type=int, default=0, help="primeira linha exibida")
+    parser.add_argument("--limite", type=int, default=30, help="linhas exibidas")
+    parser.add_argument("--ordenar", choices=["total", "rotulo"], default="total")
+    parser.add_argument("--base-dir", default=data_pipeline.BASE_DIR)
+    args = parser.parse_args(argv)
+
+    dims = args.linhas + args.colunas
+    if len(dims) != len(set(dims)) or not 2 <= len(dims) <= 3:
+        parser.error("escolha de 2 a 3 dimensões diferentes entre --linhas e --colunas")
+
+    store = data_pipeline.build_dataset(args.base_dir, save_snapshot=False).pivot_store
+    filters = {"Ano": args.anos, "Mes": args.meses, "Categoria": args.categorias}
+    result = store.crosstab(args.linhas, args.colunas, args.medida, filters,
+                            row_offset=args.offset, row_limit=args.limite, col_limit=10**6, sort_rows=args.ordenar)
+
+    print(f"=== {MEASURES[args.medida]}: {' x '.join(args.linhas)} por {' x '.join(args.colunas)} ===")
+    print(f"{result.n_rows} linhas x {result.n_cols} colunas, {result.n_cells} células preenchidas; "
+          f"exibindo linhas {args.offset + 1}-{args.offset + len(result.table)}\n")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(with_totals(result).to_string(float_format=lambda v: f"{v:,.2f}"))
+        if not result.subtotals.empty:
+            print(f"\nSubtotais por {args.linhas[0]}:")
+            print(flat_columns(result.subtotals).to_string(float_format=lambda v: f"{v:,.2f}"))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 import warnings
 import glob
+import time
+import numpy as np
+
+from data_pipeline import month_names
+from dataset_watcher import DatasetWatcher
+from data_quality import summarize_by_rule, summarize_by_sheet
+import price_sketches
+import competitor_ranking
+import time_rollups
+import pricing_simulator
+import sales_forecast
+import sparse_pivot
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -17,301 +29,17 @@ st.set_page_config(
     layout="wide"
 )
 
-# Constantes
 # Constantes
 # BASE_DIR agora é relativo ao local onde o script está rodando (compatível com Deploy)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PIVOT_COL_PAGE = 24  # colunas por página no drill-down
 
-FILE_PATTERNS = [
-    {"pattern": "*1* SEMESTRE 2024*.xlsx", "year": 2024, "semester": 1, "engine": "openpyxl", "header_row": 1},
-    {"pattern": "*2* SEMESTRE 2024*.xlsb", "year": 2024, "semester": 2, "engine": "pyxlsb", "header_row": 0}, 
-    {"pattern": "*1* SEMESTRE 2025*.xlsb", "year": 2025, "semester": 1, "engine": "pyxlsb", "header_row": 0},
-    {"pattern": "*2* SEMESTRE 2025*.xlsb", "year": 2025, "semester": 2, "engine": "pyxlsb", "header_row": 0}
-]
-
-# ... existing code ...
-
-
-
-# PRIORIDADES DE MAPEAMENTO (Ordem importa!)
-# Lista de tuplas (Campo Destino, [Lista de Candidatos em Ordem de Prioridade])
-COLUMN_PRIORITIES = [
-    ("Valor_Unitario", ["R$ FINAL", "R$ RESMA", "R$ TOTAL", "VALOR"]),
-    ("Empresa", ["VENCEDOR", "RAZÃO SOCIAL", "PARCEIRO", "FORNECEDOR"]),
-    ("Marca", ["MARCA"]),
-    ("Volume", ["VOLUME (RESMAS)", "VOLUME", "QUANTIDADE", "QTD"])
-]
+@st.cache_resource
+def get_watcher():
+    """Um único watcher por servidor: reconstrói o dataset em background quando as planilhas mudam."""
+    return DatasetWatcher(BASE_DIR).start()
 
-# Termos proibidos em nomes de colunas para certos campos
-BLACKLIST_TERMS = {
-    "Empresa": ["ANTERIOR", "STATUS", "SITUAÇÃO", "RESULTADO", "COLOCAÇÃO", "ULTIMO"],
-    "Valor_Unitario": ["ANTERIOR", "ESTIMADO", "DIFERENÇA"]
-}
-
-months_lookup = {
-    "JANEIRO": 1, "FEVEREIRO": 2, "MARÇO": 3, "MARCO": 3, "ABRIL": 4, 
-    "MAIO": 5, "JUNHO": 6, "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9, 
-    "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12
-}
-
-month_names = {v: k for k, v in months_lookup.items() if k != "MARCO"}
-
-def dedup_columns(columns):
-    seen = {}
-    new_cols = []
-    for col in columns:
-        if col in seen:
-            seen[col] += 1
-            new_cols.append(f"{col}.{seen[col]}")
-        else:
-            seen[col] = 0
-            new_cols.append(col)
-    return new_cols
-
-@st.cache_data
-def load_data():
-    all_data = []
-    debug_logs = []
-
-    # Helper to find header row dynamically
-    def detect_header_row(df_preview):
-        # ... (keep existing)
-        keywords = ["DATA DO EVENTO", "NRO DO PREGÃO", "VOLUME", "VENCEDOR", "VALOR", "EMPRESA", "PARCEIRO", "R$ FINAL"]
-        for i, row in df_preview.iterrows():
-            row_vals = [str(x).upper() for x in row.values if pd.notna(x)]
-            matches = 0
-            for k in keywords:
-                if any(k in val for val in row_vals):
-                    matches += 1
-            if matches >= 3:
-                return i
-        return 0 # Fallback
-
-    def smart_glob(base_dir, pattern):
-        """
-        Robust file finder that ignores case and encoding differences.
-        Replaces * with wildcard logic.
-        """
-        import unicodedata
-        
-        try:
-            all_files = os.listdir(base_dir)
-        except Exception as e:
-            debug_logs.append(f"Error listing dir {base_dir}: {e}")
-            return []
-            
-        # Normalize pattern for comparison
-        # Remove * for splitting, but keep order
-        # Actually, let's just convert glob pattern to regex for flexibility
-        # Pattern: *1* SEMESTRE 2024*.xlsx
-        # We can just check if all 'essential' parts exist in the right order?
-        # Simpler: Use fnmatch but on lowercased normalized strings
-        
-        import fnmatch
-        
-        matched = []
-        pattern_norm = unicodedata.normalize('NFC', pattern).lower()
-        
-        for f in all_files:
-            f_norm = unicodedata.normalize('NFC', f).lower()
-            if fnmatch.fnmatch(f_norm, pattern_norm):
-                matched.append(os.path.join(base_dir, f))
-        
-        return sorted(matched)
-
-    for info in FILE_PATTERNS:
-        # Using smart_glob instead of glob.glob
-        found_files = smart_glob(BASE_DIR, info["pattern"])
-        
-        if not found_files:
-            debug_logs.append(f"ARQUIVO NÃO ENCONTRADO (Pattern: {info['pattern']})")
-            continue
-            
-        actual_path = found_files[0]
-        filename = os.path.basename(actual_path)
-            
-        try:
-            if info["engine"] == "openpyxl":
-                # For xlsx in 2024/2025, headers can be inconsistent 
-                xl = pd.ExcelFile(actual_path, engine="openpyxl")
-                sheet_names = xl.sheet_names
-            else:
-                 # xlsb
-                xl = pd.ExcelFile(actual_path, engine="pyxlsb")
-                sheet_names = xl.sheet_names
-
-            for sheet in sheet_names:
-                upper_sheet = sheet.upper().strip()
-                month_num = months_lookup.get(upper_sheet)
-                
-                if not month_num:
-                    continue 
-                
-                # Step 1: Read valid preview to find header
-                try:
-                    df_preview = pd.read_excel(actual_path, sheet_name=sheet, engine=info["engine"], header=None, nrows=10)
-                    header_idx = detect_header_row(df_preview)
-                except Exception as e:
-                    debug_logs.append(f"Error previewing {filename} [{sheet}]: {e}")
-                    header_idx = info["header_row"] # Fallback to config
-                
-                # Step 2: Read full sheet with detected header
-                try:
-                    df = pd.read_excel(actual_path, sheet_name=sheet, engine=info["engine"], header=header_idx)
-                except Exception as e:
-                     debug_logs.append(f"Error reading {filename} [{sheet}] with header={header_idx}: {e}")
-                     continue
-
-                raw_cols = [str(c).strip().upper() for c in df.columns]
-                df.columns = dedup_columns(raw_cols)
-                
-                # --- LOGICA DE MAPEAMENTO POR PRIORIDADE ---
-                rename_dict = {}
-                found_targets = set()
-                
-                # Status keywords to detect if a column is actually a status column
-                STATUS_KEYWORDS_SET = {"GANHAMOS", "PERDEMOS", "SUSPENSA", "SUSPENSO", "ADIADO", "ADIOU", "CANCELADO", "FRACASSADO", "DESCLASSIFICADO", "NÃO PARTICIPAMOS"}
-
-                def is_status_column(series):
-                     # Check if a significant portion of the non-null values are status keywords
-                     sample = series.dropna().astype(str).str.upper().str.strip()
-                     if sample.empty: return False
-                     
-                     # Check precise matches or partial matches
-                     match_count = sample.apply(lambda x: any(k in x for k in STATUS_KEYWORDS_SET) or x in STATUS_KEYWORDS_SET).sum()
-                     return (match_count / len(sample)) > 0.3 # If >30% looks like status, it's a status column
-
-                for target, candidates in COLUMN_PRIORITIES:
-                    # Tenta encontrar o melhor candidato
-                    best_match = None
-                    valid_candidates = []
-
-                    for candidate in candidates:
-                        # Busca colunas que contêm o termo candidato
-                        matches = [c for c in df.columns if candidate in c]
-                        
-                        # Filtrar blacklist
-                        if target in BLACKLIST_TERMS:
-                            matches = [c for c in matches if not any(bad in c for bad in BLACKLIST_TERMS[target])]
-                        
-                        # Apply content validation for 'Empresa'
-                        if target == "Empresa":
-                             filtered_matches = []
-                             for m in matches:
-                                 if not is_status_column(df[m]):
-                                     filtered_matches.append(m)
-                                 else:
-                                     # Optionally log this rejection?
-                                     pass
-                             matches = filtered_matches
-                        
-                        if matches:
-                             valid_candidates.extend(matches)
-                    
-                    if valid_candidates:
-                        # Find the shortest match among all valid candidates found across all candidate keywords
-                        # But we should prioritize the order of candidates (e.g. VENCEDOR > RAZÃO SOCIAL)
-                        # So we take the matches from the *first* candidate keyword that produced valid matches
-                        # Reworking the loop slightly to stop at first HIT
-                        pass 
-
-                    # Re-run logic correctly with early break:
-                    for candidate in candidates:
-                         matches = [c for c in df.columns if candidate in c]
-                         if target in BLACKLIST_TERMS:
-                            matches = [c for c in matches if not any(bad in c for bad in BLACKLIST_TERMS[target])]
-                         
-                         if target == "Empresa":
-                             matches = [m for m in matches if not is_status_column(df[m])]
-                         
-                         if matches:
-                             best_match = min(matches, key=len)
-                             break
-                    
-                    if best_match:
-                        rename_dict[best_match] = target
-                        found_targets.add(target)
-                
-                df.rename(columns=rename_dict, inplace=True)
-                
-                # Validation
-                missing = [t[0] for t in COLUMN_PRIORITIES if t[0] not in found_targets]
-                if not missing:
-                    cols_to_keep = ["Empresa", "Marca", "Valor_Unitario", "Volume"]
-                    subset_df = df[cols_to_keep].copy()
-                    subset_df["Ano"] = info["year"]
-                    subset_df["Mes"] = month_num
-                    subset_df["Origem"] = filename
-                    all_data.append(subset_df)
-                else:
-                    debug_logs.append(f"MISSING {missing} in {filename} [{sheet}] (Header Row: {header_idx}). Found: {df.columns.tolist()}")
-                    
-        except Exception as e:
-            debug_logs.append(f"ERROR reading {filename}: {str(e)}")
-
-    if not all_data:
-        return pd.DataFrame(), debug_logs
-
-    full_df = pd.concat(all_data, ignore_index=True)
-    return full_df, debug_logs
-
-@st.cache_data
-def clean_and_process(df):
-    if df.empty: return df
-        
-    def clean_money(val):
-        if pd.isna(val): return 0.0
-        s = str(val).upper().replace("R$", "").replace(" ", "")
-        if "," in s:
-            s = s.replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except:
-            return 0.0
-            
-    df["Valor_Unitario"] = df["Valor_Unitario"].apply(clean_money)
-    df = df[df["Valor_Unitario"] > 0]
-    
-    def clean_vol(val):
-        if pd.isna(val): return 0.0
-        s = str(val).upper().replace(" ", "")
-        if "," in s:
-            s = s.replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except:
-            return 0.0
-            
-    if "Volume" not in df.columns:
-        df["Volume"] = 1.0
-    else:
-        df["Volume"] = df["Volume"].apply(clean_vol).replace(0, 1)
-        
-    df["Total_Venda"] = df["Valor_Unitario"] * df["Volume"]
-    
-    # Categorização
-    df = df[df["Empresa"].notna()]
-    df = df[df["Empresa"].astype(str).str.strip() != ""]
-    
-    df["Empresa_Clean"] = df["Empresa"].astype(str).str.upper()
-    
-    # Filtro Extra: Remover nomes de empresa que parecem status ("GANHAMOS", "PERDEMOS") caso tenha passado
-    status_keywords = ["GANHAMOS", "PERDEMOS", "DESCLASSIFICADO", "FRACASSADO"]
-    df = df[~df["Empresa_Clean"].isin(status_keywords)]
-    
-    def categorize(name):
-        if any(t in name for t in ["RDF", "RD F", "R.D.F"]):
-            return "RDF"
-        elif "ATUAL" in name:
-            return "ATUAL"
-        else:
-            return "OUTROS"
-            
-    df["Categoria"] = df["Empresa_Clean"].apply(categorize)
-    
-    return df
-
-def generate_insights(df, df_filtered_my_companies):
+def generate_insights(df, df_filtered_my_companies, forecasts=None):
     insights = []
     
     total_sales = df["Total_Venda"].sum()
@@ -320,12 +48,30 @@ def generate_insights(df, df_filtered_my_companies):
     
     insights.append(f"**Market Share Global**: As empresas RDF e ATUAL representam **{share:.2f}%** do faturamento total analisado (R$ {total_sales:,.2f}).")
     
-    sales_by_year = df_filtered_my_companies.groupby("Ano")["Total_Venda"].sum()
-    if 2024 in sales_by_year and 2025 in sales_by_year:
-        growth = ((sales_by_year[2025] - sales_by_year[2024]) / sales_by_year[2024]) * 100
-        trend = "CRESCIMENTO" if growth > 0 else "QUEDA"
-        emoji = "xC4" if growth > 0 else "xCE"
-        insights.append(f"**Comparativo Anual (RDF+ATUAL)**: Houve um(a) {emoji} **{trend} de {growth:.1f}%** em 2025 comparado a 2024.")
+    years = sorted(df_filtered_my_companies["Ano"].unique())
+    if len(years) >= 2:
+        prev_year, last_year = years[-2], years[-1]
+        # Compara só os meses que o último ano já tem (o ano corrente pode estar incompleto)
+        last_months = df_filtered_my_companies.loc[df_filtered_my_companies["Ano"] == last_year, "Mes"].unique()
+        same_months = df_filtered_my_companies[df_filtered_my_companies["Mes"].isin(last_months)]
+        sales_by_year = same_months.groupby("Ano")["Total_Venda"].sum()
+        if sales_by_year.get(prev_year, 0) > 0:
+            growth = ((sales_by_year[last_year] - sales_by_year[prev_year]) / sales_by_year[prev_year]) * 100
+            trend = "CRESCIMENTO" if growth > 0 else "QUEDA"
+            emoji = "xC4" if growth > 0 else "xCE"
+            period = "" if len(last_months) == 12 else f" (mesmos {len(last_months)} meses)"
+            insights.append(f"**Comparativo Anual (RDF+ATUAL)**: Houve um(a) {emoji} **{trend} de {growth:.1f}%** em {last_year} comparado a {prev_year}{period}.")
+
+        remaining = sales_forecast.remaining_months(df)
+        if forecasts is not None and remaining and not forecasts.empty:
+            own_forecast = forecasts[forecasts["Categoria"].isin(["RDF", "ATUAL"]) & (forecasts["Horizonte"] <= remaining)]
+            full_year = sales_by_year.get(last_year, 0) + own_forecast["Previsao"].sum()
+            prev_total = df_filtered_my_companies.loc[df_filtered_my_companies["Ano"] == prev_year, "Total_Venda"].sum()
+            if prev_total > 0:
+                insights.append(
+                    f"**Projeção {last_year} (RDF+ATUAL)**: com os {remaining} meses restantes projetados, o ano fecharia em "
+                    f"R$ {full_year:,.2f} ({(full_year - prev_total) / prev_total * 100:+.1f}% vs {prev_year})."
+                )
     
     return insights
 
@@ -334,13 +80,23 @@ def generate_insights(df, df_filtered_my_companies):
 st.title("xC4 Análise de Vendas: RDF & ATUAL vs Mercado")
 
 # Carga de Dados
+# Só a primeira sessão do servidor espera a leitura; depois o watcher troca a versão em background
 with st.spinner("Carregando planilhas..."):
-    raw_df, debug_logs = load_data()
-    # clean_and_process agora aplica os filtros de exclusão
-    df = clean_and_process(raw_df)
+    watcher = get_watcher()
+    dataset = watcher.current()
+
+raw_df, debug_logs = dataset.raw_df, dataset.debug_logs
+# clean_and_process (no pipeline) já aplicou os filtros de exclusão
+df = dataset.df
 
 # Sidebar Debug
 with st.sidebar.expander("Debug Logs", expanded=False):
+    status = watcher.status()
+    st.write(f"Versão dos dados: `{status['version']}` ({status['mode']}, {status['build_seconds']:.1f}s)")
+    if status["last_error"]:
+        st.write(status["last_error"])
+    if st.button("Verificar planilhas agora"):
+        watcher.request_refresh()
     for log in debug_logs:
         st.write(log)
     if not df.empty:
@@ -392,27 +148,58 @@ col3.metric("Vendas Outras Empresas", f"R$ {total_others:,.2f}")
 st.divider()
 
 st.subheader("xC9 Insights")
-insights = generate_insights(df, df[(df["Categoria"].isin(["RDF", "ATUAL"]))]) 
+insights = generate_insights(df, df[(df["Categoria"].isin(["RDF", "ATUAL"]))], dataset.forecasts)
 for i in insights:
     st.markdown(f"- {i}")
 
 st.divider()
 
-tab1, tab2, tab3, tab4 = st.tabs(["Comparativo Mensal", "Market Share", "Dados Brutos", "Data Inspector (Debug)"])
+tab1, tab2, tab_precos, tab_ranking, tab_simulador, tab_pivot, tab3, tab4 = st.tabs(["Comparativo Mensal", "Market Share", "Preços", "Ranking Concorrentes", "Simulador", "Drill-down", "Dados Brutos", "Data Inspector (Debug)"])
 
 with tab1:
     st.markdown("### Evolução Mensal")
-    date_df = filtered_df.assign(year=filtered_df["Ano"], month=filtered_df["Mes"], day=1)
-    filtered_df["Data"] = pd.to_datetime(date_df[["year", "month", "day"]])
-    
-    monthly_cat = filtered_df.groupby(["Data", "Categoria"])["Total_Venda"].sum().reset_index()
-    monthly_cat = monthly_cat.sort_values("Data")
+    gc1, gc2 = st.columns([1, 3])
+    level = gc1.radio(
+        "Granularidade", options=list(time_rollups.LEVELS), index=list(time_rollups.LEVELS).index("M"),
+        format_func=lambda lv: time_rollups.LEVELS[lv][0], horizontal=True
+    )
+    empresas_opts = sorted(dataset.time_rollups["M"]["Empresa"].unique()) if not df.empty else []
+    selected_empresas = gc2.multiselect("Empresas (opcional)", options=empresas_opts)
+
+    # Lê o rollup pré-calculado do nível escolhido (data do evento), não as linhas
+    rollup = time_rollups.select_rollup(dataset.time_rollups, level, selected_years, selected_months_nums, selected_empresas)
+    color_by = "Empresa" if selected_empresas else "Categoria"
+    series_df = rollup.groupby(["Periodo", color_by], as_index=False)["Total_Venda"].sum().sort_values("Periodo")
     
     fig = px.bar(
-        monthly_cat, x="Data", y="Total_Venda", color="Categoria",
-        title="Vendas Mensais por Categoria",
+        series_df, x="Periodo", y="Total_Venda", color=color_by,
+        title=f"Vendas por {time_rollups.LEVELS[level][0]} e {color_by}",
         color_discrete_map={"RDF": "#1f77b4", "ATUAL": "#ff7f0e", "OUTROS": "#d62728"}
     )
+    fig.update_layout(xaxis_title="Data do Evento")
+
+    # Projeção (pré-calculada por versão do dataset) só no nível mensal
+    if level == "M" and not dataset.forecasts.empty:
+        fc1, fc2 = st.columns([1, 3])
+        show_forecast = fc1.checkbox("Mostrar projeção", value=True)
+        horizon = fc2.slider(
+            "Meses projetados", min_value=1, max_value=sales_forecast.MAX_HORIZON,
+            value=sales_forecast.remaining_months(df) or 3
+        )
+        if show_forecast:
+            projection = sales_forecast.aggregate_forecast(dataset.forecasts, [color_by], horizon=horizon, empresas=selected_empresas)
+            for name, group in projection.groupby(color_by):
+                color = {"RDF": "#1f77b4", "ATUAL": "#ff7f0e", "OUTROS": "#d62728"}.get(name, "gray")
+                fig.add_trace(go.Scatter(x=group["Periodo"], y=group["P90"], line=dict(width=0), showlegend=False, hoverinfo="skip", legendgroup=f"proj_{name}"))
+                fig.add_trace(go.Scatter(
+                    x=group["Periodo"], y=group["P10"], fill="tonexty", line=dict(width=0),
+                    fillcolor="rgba(128,128,128,0.2)", showlegend=False, hoverinfo="skip", legendgroup=f"proj_{name}"
+                ))
+                fig.add_trace(go.Scatter(
+                    x=group["Periodo"], y=group["Previsao"], name=f"{name} (projeção)", mode="lines+markers",
+                    line=dict(color=color, dash="dash"), legendgroup=f"proj_{name}"
+                ))
+            st.caption("Projeção: modelo sazonal por Categoria x Empresa x Marca; faixa sombreada = P10-P90.")
     st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
@@ -426,7 +213,214 @@ with tab2:
     )
     st.plotly_chart(fig_pie, use_container_width=True)
 
+with tab_precos:
+    st.markdown("### Distribuição de Preços (Valor Unitário)")
+    st.caption(f"Quantis estimados por sketches com erro relativo máximo de {price_sketches.RELATIVE_ACCURACY:.0%}.")
+    sketches = dataset.price_sketches
+
+    pc1, pc2 = st.columns([1, 3])
+    weight = pc1.radio("Peso", options=list(price_sketches.WEIGHTS), format_func=price_sketches.WEIGHTS.get)
+    marcas_opts = sorted(sketches["Marca"].unique()) if not sketches.empty else []
+    selected_marcas = pc2.multiselect("Marcas", options=marcas_opts, default=marcas_opts)
+
+    selected_sk = price_sketches.select_sketches(sketches, years=selected_years, months=selected_months_nums, marcas=selected_marcas)
+
+    if selected_sk.empty:
+        st.info("Sem preços para a seleção atual.")
+    else:
+        selected_sk = selected_sk.assign(Data=pd.to_datetime(dict(year=selected_sk["Ano"], month=selected_sk["Mes"], day=1)))
+
+        # Faixa P10-P90 do mercado (todas as categorias) + mediana de cada categoria
+        market_bands = price_sketches.price_bands(selected_sk, ["Data"], weight=weight)
+        cat_bands = price_sketches.price_bands(selected_sk, ["Data", "Categoria"], weight=weight)
+
+        fig_prices = go.Figure()
+        fig_prices.add_trace(go.Scatter(x=market_bands["Data"], y=market_bands["P90"], line=dict(width=0), showlegend=False, hoverinfo="skip"))
+        fig_prices.add_trace(go.Scatter(
+            x=market_bands["Data"], y=market_bands["P10"], fill="tonexty", line=dict(width=0),
+            fillcolor="rgba(150,150,150,0.3)", name="Mercado P10-P90"
+        ))
+        fig_prices.add_trace(go.Scatter(x=market_bands["Data"], y=market_bands["P50"], name="Mercado P50", line=dict(color="gray", dash="dash")))
+        for cat, color in {"RDF": "#1f77b4", "ATUAL": "#ff7f0e", "OUTROS": "#d62728"}.items():
+            cat_df = cat_bands[cat_bands["Categoria"] == cat]
+            if not cat_df.empty:
+                fig_prices.add_trace(go.Scatter(x=cat_df["Data"], y=cat_df["P50"], name=f"{cat} P50", mode="lines+markers", line=dict(color=color)))
+        fig_prices.update_layout(title="Faixa de Preço Mensal", yaxis_title="R$ por unidade")
+        st.plotly_chart(fig_prices, use_container_width=True)
+
+        st.markdown("#### Faixas por Marca e Categoria")
+        st.dataframe(price_sketches.price_bands(selected_sk, ["Marca", "Categoria"], weight=weight), hide_index=True)
+
+        # Onde a mediana de RDF/ATUAL cai dentro da distribuição dos concorrentes da mesma marca
+        st.markdown("#### Posição de RDF / ATUAL frente aos concorrentes")
+        ranks = []
+        own = price_sketches.price_bands(selected_sk[selected_sk["Categoria"].isin(["RDF", "ATUAL"])], ["Marca", "Categoria"], weight=weight)
+        for row in own.itertuples(index=False):
+            competitors = price_sketches.select_sketches(selected_sk, marcas=[row.Marca], categorias=["OUTROS"])
+            merged = price_sketches.merge_sketches(competitors, weight=weight)
+            ranks.append({
+                "Marca": row.Marca,
+                "Categoria": row.Categoria,
+                "P50 Próprio": row.P50,
+                "P50 Concorrentes": price_sketches.quantiles(merged, [0.5])[0],
+                "Percentil no Mercado": price_sketches.percentile_rank(merged, [row.P50])[0],
+            })
+        if ranks:
+            st.dataframe(pd.DataFrame(ranks), hide_index=True)
+        else:
+            st.write("RDF/ATUAL sem lances na seleção atual.")
+
+with tab_ranking:
+    st.markdown("### Ranking de Concorrentes")
+    aggregates = dataset.competitor_aggregates
+
+    rc1, rc2, rc3 = st.columns(3)
+    metric = rc1.radio("Métrica", options=list(competitor_ranking.METRICS), format_func=competitor_ranking.METRICS.get)
+    top_n_size = rc2.slider("Top N", min_value=5, max_value=50, value=10, step=5)
+    include_own = rc3.checkbox("Incluir RDF / ATUAL", value=True)
+
+    ranking_marcas_opts = sorted(aggregates["Marca"].unique()) if not aggregates.empty else []
+    ranking_marcas = st.multiselect("Marcas", options=ranking_marcas_opts, default=ranking_marcas_opts, key="ranking_marcas")
+
+    # Período de comparação: por padrão os mesmos meses do ano anterior
+    available_years = sorted(df["Ano"].unique())
+    default_compare = [y - 1 for y in selected_years if y - 1 in available_years]
+    compare_years = st.multiselect("Comparar com os anos", options=available_years, default=default_compare)
+
+    ranking = competitor_ranking.competitor_ranking(
+        aggregates, metric=metric, n=top_n_size,
+        years=selected_years, months=selected_months_nums, marcas=ranking_marcas, include_own=include_own,
+        compare_years=compare_years or None, compare_months=selected_months_nums if compare_years else None
+    )
+
+    if ranking.empty:
+        st.info("Sem vendas para a seleção atual.")
+    else:
+        fig_rank = px.bar(
+            ranking.iloc[::-1], x=metric, y="Empresa", color="Categoria", orientation="h",
+            title=f"Top {top_n_size} por {competitor_ranking.METRICS[metric]}",
+            color_discrete_map={"RDF": "#1f77b4", "ATUAL": "#ff7f0e", "OUTROS": "#d62728"}
+        )
+        st.plotly_chart(fig_rank, use_container_width=True)
+
+        if "Variacao" in ranking.columns:
+            ranking["Movimento"] = ranking["Variacao"].map(
+                lambda v: "novo" if pd.isna(v) else ("=" if v == 0 else (f"▲ {int(v)}" if v > 0 else f"▼ {int(-v)}"))
+            )
+        st.dataframe(ranking, hide_index=True)
+
+with tab_simulador:
+    st.markdown("### Simulador de Preços (E se...)")
+    st.caption(
+        "Ajusta o preço das células escolhidas e recalcula receita, share e crescimento para toda a grade de cenários. "
+        "Com elasticidade > 0, preço menor ganha volume dos demais fornecedores do mesmo mês (volume total do mês é mantido)."
+    )
+    scenario_cube = pricing_simulator.select_cells(dataset.scenario_cube, selected_years, selected_months_nums)
+    sim_marcas_opts = sorted(scenario_cube["Marca"].unique()) if not scenario_cube.empty else []
+
+    def scenario_axis(label, key, default_cat):
+        c1, c2, c3 = st.columns([1, 2, 2])
+        cats = c1.multiselect(f"Categoria ({label})", options=["RDF", "ATUAL", "OUTROS"], default=[default_cat], key=f"{key}_cat")
+        marcas = c2.multiselect(f"Marcas ({label}, vazio = todas)", options=sim_marcas_opts, key=f"{key}_marcas")
+        low, high = c3.slider(f"Ajuste de preço % ({label})", min_value=-50, max_value=50, value=(-20, 10), key=f"{key}_range")
+        mask = pricing_simulator.target_mask(scenario_cube, cats, marcas or None, months=adjust_months)
+        return (label, mask, np.arange(low, high + 1, step) / 100)
+
+    sc1, sc2, sc3 = st.columns(3)
+    step = sc1.select_slider("Passo (%)", options=[1, 2, 5, 10], value=1)
+    elasticity = sc2.slider("Elasticidade preço-volume", min_value=0.0, max_value=5.0, value=0.0, step=0.5)
+    adjust_months = sc3.multiselect(
+        "Meses com ajuste", options=selected_months_nums, default=selected_months_nums,
+        format_func=lambda x: month_names.get(x, str(x))
+    )
+
+    axes = [scenario_axis("Eixo 1", "sim1", "RDF")]
+    if st.checkbox("Adicionar 2º eixo"):
+        axes.append(scenario_axis("Eixo 2", "sim2", "ATUAL"))
+
+    if scenario_cube.empty or not any(mask.any() for _, mask, _ in axes):
+        st.info("Nenhuma venda corresponde aos alvos escolhidos.")
+    else:
+        sim_start = time.perf_counter()
+        scenarios, base = pricing_simulator.run_scenarios(scenario_cube, axes, elasticity)
+        st.write(f"{len(scenarios)} cenários calculados em {(time.perf_counter() - sim_start) * 1000:.0f} ms. Share atual: **{base['share'][0]:.2f}%**")
+
+        if len(axes) == 1:
+            fig_sim = px.line(scenarios, x="Eixo 1", y="Share RDF+ATUAL (%)", markers=True, title="Share RDF+ATUAL por ajuste de preço")
+            fig_sim.update_layout(xaxis_title="Ajuste de preço (%)")
+        else:
+            heat = scenarios.pivot_table(index="Eixo 2", columns="Eixo 1", values="Share RDF+ATUAL (%)")
+            fig_sim = px.imshow(heat, origin="lower", aspect="auto", color_continuous_scale="RdYlGn", title="Share RDF+ATUAL (%) por ajuste de preço",
+                                labels=dict(x="Ajuste Eixo 1 (%)", y="Ajuste Eixo 2 (%)", color="Share %"))
+        st.plotly_chart(fig_sim, use_container_width=True)
+        st.dataframe(scenarios, hide_index=True)
+
+with tab_pivot:
+    st.markdown("### Drill-down (Tabela Dinâmica)")
+    st.caption("Escolha de 2 a 3 dimensões entre linhas e colunas. Totais vêm do agregado esparso completo; só a página visível é montada.")
+    pivot_store = dataset.pivot_store
+
+    pv1, pv2, pv3 = st.columns(3)
+    pivot_rows = pv1.multiselect("Linhas", options=sparse_pivot.PIVOT_DIMENSIONS, default=["Categoria", "Empresa"], max_selections=2)
+    free_dims = [d for d in sparse_pivot.PIVOT_DIMENSIONS if d not in pivot_rows]
+    pivot_cols = pv2.multiselect("Colunas", options=free_dims, default=free_dims[:1], max_selections=2)
+    pivot_measure = pv3.radio("Medida", options=list(sparse_pivot.MEASURES), format_func=sparse_pivot.MEASURES.get, horizontal=True)
+
+    pv4, pv5, pv6 = st.columns(3)
+    page_size = pv4.selectbox("Linhas por página", options=[25, 50, 100, 250], index=1)
+    pivot_sort = pv5.radio("Ordenar linhas por", options=["total", "rotulo"], format_func={"total": "Total", "rotulo": "Rótulo"}.get, horizontal=True)
+    row_page = pv6.number_input("Página", min_value=1, value=1, step=1)
+    # A página de colunas de outro cruzamento não vale para o atual
+    pivot_dims = (tuple(pivot_rows), tuple(pivot_cols))
+    if st.session_state.get("pivot_dims") != pivot_dims:
+        st.session_state["pivot_dims"] = pivot_dims
+        st.session_state["pivot_col_page"] = 1
+    col_page = st.session_state.get("pivot_col_page", 1)
+
+    if not pivot_rows or not pivot_cols or len(pivot_rows) + len(pivot_cols) > 3:
+        st.info("Selecione ao menos uma dimensão de linha e uma de coluna (no máximo 3 no total).")
+    elif len(pivot_store) == 0:
+        st.info("Sem dados.")
+    else:
+        pivot_start = time.perf_counter()
+        crosstab = lambda page, cpage: pivot_store.crosstab(
+            pivot_rows, pivot_cols, pivot_measure, filters={"Ano": selected_years, "Mes": selected_months_nums},
+            row_offset=(page - 1) * page_size, row_limit=page_size,
+            col_offset=(cpage - 1) * PIVOT_COL_PAGE, col_limit=PIVOT_COL_PAGE, sort_rows=pivot_sort
+        )
+        pivot = crosstab(row_page, col_page)
+        col_pages = max(1, -(-pivot.n_cols // PIVOT_COL_PAGE))
+        row_overflow = len(pivot.table.index) == 0 and pivot.n_rows > 0
+        if row_overflow or col_page > col_pages:
+            # Página além do fim (ex.: filtros mudaram): mostra a última
+            if row_overflow:
+                row_page = -(-pivot.n_rows // page_size)
+            col_page = min(col_page, col_pages)
+            pivot = crosstab(row_page, col_page)
+        st.session_state["pivot_col_page"] = col_page
+        st.write(
+            f"{pivot.n_rows:,} linhas x {pivot.n_cols:,} colunas ({pivot.n_cells:,} células preenchidas) — "
+            f"página {row_page} de {max(1, -(-pivot.n_rows // page_size))}, em {(time.perf_counter() - pivot_start) * 1000:.0f} ms"
+        )
+        if pivot.n_cols > PIVOT_COL_PAGE:
+            st.number_input("Página de colunas", min_value=1, max_value=col_pages, step=1, key="pivot_col_page")
+        st.dataframe(sparse_pivot.with_totals(pivot))
+        if not pivot.subtotals.empty:
+            with st.expander(f"Subtotais por {pivot_rows[0]}"):
+                st.dataframe(sparse_pivot.flat_columns(pivot.subtotals))
+
 with tab3:
+    st.markdown("### Busca por Pregão")
+    bc1, bc2 = st.columns([2, 2])
+    pregao_query = bc1.selectbox("Nro do Pregão", options=[""] + dataset.tender_index.pregoes())
+    event_range = bc2.date_input("Data do Evento", value=(), format="DD/MM/YYYY")
+    start, end = (event_range + (None, None))[:2] if isinstance(event_range, tuple) else (event_range, event_range)
+    if pregao_query or start:
+        tender_rows = dataset.tender_index.lookup(pregao=pregao_query or None, start=start, end=end or start)
+        st.write(f"{len(tender_rows)} linha(s) encontradas")
+        st.dataframe(tender_rows, hide_index=True)
+
+    st.markdown("### Dados Filtrados")
     st.dataframe(filtered_df)
 
 with tab4:
@@ -435,3 +429,24 @@ with tab4:
     st.write("Origem dos dados:", df["Origem"].value_counts())
     st.write("Columns in df:", df.columns.tolist())
     st.dataframe(others_df.head(50))
+
+    st.markdown("### Qualidade dos Dados")
+    quality_report = dataset.quality_report
+    quarantine = dataset.quarantine
+    q1, q2, q3 = st.columns(3)
+    q1.metric("Linhas lidas", f"{len(raw_df):,}")
+    q2.metric("Linhas aprovadas", f"{len(df):,}")
+    q3.metric("Linhas em quarentena", f"{len(quarantine):,}")
+
+    if quality_report.empty:
+        st.write("Nenhuma regra de qualidade disparou.")
+    else:
+        st.write("Linhas por regra:")
+        st.dataframe(summarize_by_rule(quality_report), hide_index=True)
+        st.write("Linhas por planilha e regra:")
+        st.dataframe(summarize_by_sheet(quality_report))
+
+    if not quarantine.empty:
+        motivos = st.multiselect("Motivo", options=sorted(quarantine["Motivo"].unique()), default=sorted(quarantine["Motivo"].unique()))
+        st.dataframe(quarantine[quarantine["Motivo"].isin(motivos)])
+        st.download_button("Baixar quarentena (CSV)", quarantine.to_csv(index=False).encode("utf-8"), file_name=f"quarentena_{dataset.version}.csv", mime="text/csv")
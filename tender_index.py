@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from data_quality import normalize_pregao
+
+# Índice de pregões: número do pregão -> posições das linhas, e datas do evento
+# ordenadas para consultas por intervalo com busca binária. Construído uma vez
+# por versão do dataset, então a busca de um pregão não varre o dataframe.
+
+class TenderIndex:
+    """Índice de consulta por número de pregão e data do evento."""
+
+    def __init__(self, df):
+        self.df = df
+        if df.empty or "Pregao" not in df.columns:
+            self.by_pregao = {}
+            self.date_values = np.array([], dtype="datetime64[ns]")
+            self.date_positions = np.array([], dtype=np.int64)
+            return
+
+        pregao = df["Pregao"].astype(object).where(df["Pregao"].notna(), None)
+        self.by_pregao = {
+            key: positions for key, positions in
+            pd.Series(np.arange(len(df))).groupby(pregao.to_numpy(), dropna=True).indices.items()
+        }
+
+        dates = df["Data_Evento"].to_numpy(dtype="datetime64[ns]")
+        has_date = ~np.isnat(dates)
+        order = np.argsort(dates[has_date], kind="stable")
+        self.date_positions = np.flatnonzero(has_date)[order]
+        self.date_values = dates[has_date][order]
+
+    def pregoes(self):
+        return sorted(self.by_pregao)
+
+    def positions_for_pregao(self, pregao):
+        key = normalize_pregao(pd.Series([pregao])).iloc[0]
+        return self.by_pregao.get(key, np.array([], dtype=np.int64))
+
+    def positions_for_dates(self, start=None, end=None):
+        """Posições com Data_Evento em [start, end] (limites opcionais, inclusivos)."""
+        lo = 0 if start is None else np.searchsorted(self.date_values, np.datetime64(pd.Timestamp(start), "ns"), side="left")
+        hi = len(self.date_values) if end is None else np.searchsorted(self.date_values, np.datetime64(pd.Timestamp(end), "ns"), side="right")
+        return np.sort(self.date_positions[lo:hi])
+
+    def lookup(self, pregao=None, start=None, end=None):
+        """Linhas do pregão e/ou do intervalo de datas, ordenadas por data."""
+        positions = None
+        if pregao:
+            positions = self.positions_for_pregao(pregao)
+        if start is not None or end is not None:
+            in_range = self.positions_for_dates(start, end)
+            positions = in_range if positions is None else np.intersect1d(positions, in_range)
+        if positions is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[positions].sort_values(["Data_Evento", "Pregao"], na_position="last")
+
+def build_tender_index(df):
+    return TenderIndex(df)
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from competitor_ranking import normalize_empresa
+
+# Séries temporais pela data do evento (DATA DO EVENTO), pré-agregadas em
+# dia, semana, mês e trimestre por Categoria e Empresa. O gráfico de evolução
+# lê o nível escolhido já pronto em vez de reagrupar as linhas a cada rerun.
+# Linhas sem data do evento caem no primeiro dia do mês da aba.
+
+# nível -> (rótulo, frequência do período)
+LEVELS = {
+    "D": ("Dia", "D"),
+    "W": ("Semana", "W-SUN"),
+    "M": ("Mês", "M"),
+    "Q": ("Trimestre", "Q"),
+}
+
+ROLLUP_KEYS = ["Periodo", "Ano", "Mes", "Categoria", "Empresa"]
+
+def event_dates(df):
+    """Data do evento, ou o 1º dia do mês da aba quando ausente."""
+    sheet_month = pd.to_datetime(pd.DataFrame({"year": df["Ano"], "month": df["Mes"], "day": 1}))
+    if "Data_Evento" not in df.columns:
+        return sheet_month
+    return df["Data_Evento"].fillna(sheet_month)
+
+def build_time_rollups(df):
+    """
+    Um dataframe por nível com Total_Venda, Volume e Linhas por
+    (Periodo, Ano, Mes, Categoria, Empresa). Ano/Mes são os da aba, para que
+    os filtros da barra lateral continuem valendo.
+    """
+    empty = pd.DataFrame(columns=ROLLUP_KEYS + ["Total_Venda", "Volume", "Linhas"])
+    if df.empty:
+        return {level: empty for level in LEVELS}
+
+    base = pd.DataFrame({
+        "Data": event_dates(df).to_numpy(),
+        "Ano": df["Ano"].to_numpy(),
+        "Mes": df["Mes"].to_numpy(),
+        "Categoria": df["Categoria"].to_numpy(),
+        "Empresa": normalize_empresa(df["Empresa_Clean"]).to_numpy(),
+        "Total_Venda": df["Total_Venda"].to_numpy(dtype=float),
+        "Volume": df["Volume"].to_numpy(dtype=float),
+    })
+
+    # Dia primeiro; os níveis maiores são agregados a partir dele
+    daily = base.assign(Periodo=base["Data"].dt.normalize()).groupby(ROLLUP_KEYS, as_index=False).agg(
+        Total_Venda=("Total_Venda", "sum"), Volume=("Volume", "sum"), Linhas=("Total_Venda", "size")
+    )
+    rollups = {"D": daily}
+    for level, (_, freq) in LEVELS.items():
+        if level == "D":
+            continue
+        periods = daily["Periodo"].dt.to_period(freq).dt.start_time
+        rollups[level] = daily.assign(Periodo=periods).groupby(ROLLUP_KEYS, as_index=False)[["Total_Venda", "Volume", "Linhas"]].sum()
+    return rollups
+
+def select_rollup(rollups, level, years=None, months=None, empresas=None):
+    """Rollup do nível pedido filtrado por ano/mês da aba e, opcionalmente, empresas."""
+    rollup = rollups[level]
+    mask = pd.Series(True, index=rollup.index)
+    if years is not None:
+        mask &= rollup["Ano"].isin(years)
+    if months is not None:
+        mask &= rollup["Mes"].isin(months)
+    if empresas:
+        mask &= rollup["Empresa"].isin(empresas)
+    return rollup[mask]